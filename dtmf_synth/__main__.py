@@ -0,0 +1,70 @@
+"""
+Batch-convert MIDI files to DTMF, in parallel across a process pool.
+
+    python -m dtmf_synth song1.mid song2.mid --wav --output-dir out/
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import traceback
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from .pipeline import convert_file
+from . import instrument
+
+def convert_one(input_path: str, output_dir: str, midi: bool, wav: bool, channel: int, sample_rate: int, stats: bool = False) -> dict:
+    if stats:
+        instrument.enable()
+    stem = Path(output_dir) / Path(input_path).stem
+    midi_path = f"{stem}.dtmf.mid" if midi else None
+    wav_path = f"{stem}.dtmf.wav" if wav else None
+    return convert_file(input_path, midi_path, wav_path, channel, sample_rate)
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m dtmf_synth", description="Translate MIDI files into DTMF tone sequences.")
+    parser.add_argument("inputs", nargs="+", help="MIDI files to convert")
+    parser.add_argument("-o", "--output-dir", default=".", help="directory for the output files (default: current directory)")
+    parser.add_argument("--midi", action="store_true", help="write <name>.dtmf.mid (the default if neither --midi nor --wav is given)")
+    parser.add_argument("--wav", action="store_true", help="write <name>.dtmf.wav")
+    parser.add_argument("-c", "--channel", type=int, default=0, help="MIDI channel to translate (default: 0)")
+    parser.add_argument("-r", "--sample-rate", type=int, default=44100, help="WAV sample rate (default: 44100)")
+    parser.add_argument("--stats", metavar="PATH", help="append each file's summary and pipeline counters to PATH as JSON lines")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes (default: number of cores)")
+    args = parser.parse_args(argv)
+
+    midi = args.midi or not args.wav
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    failures = 0
+    total = len(args.inputs)
+    with ExitStack() as stack:
+        stats = stack.enter_context(open(args.stats, "a")) if args.stats else None
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=max(1, min(args.jobs, total))))
+        futures = {
+            pool.submit(convert_one, path, args.output_dir, midi, args.wav, args.channel, args.sample_rate, stats is not None): path
+            for path in args.inputs
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                summary = future.result()
+            except Exception:
+                failures += 1
+                print(f"[{done}/{total}] FAILED {path}", file=sys.stderr)
+                traceback.print_exc(file=sys.stderr)
+            else:
+                print(f"[{done}/{total}] {path}: {summary['chords']} chords, {summary['distinct_chords']} distinct")
+                if stats is not None:
+                    stats.write(json.dumps(summary) + "\n")
+                    stats.flush()
+
+    if failures:
+        print(f"{failures} of {total} files failed", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Benchmarks for the reader, translator, player and renderer on synthetic MIDI workloads.
+
+    python -m dtmf_synth.benchmark --polyphony 3 --length 120 --output results.json
+    python -m dtmf_synth.benchmark --compare before.json after.json
+
+Each stage reports its throughput, the peak memory traced while it runs, and the net number of memory blocks it allocates.
+The cold-start stages ("import.*") report the time a fresh interpreter takes to import a module, or to make a first call.
+"""
+from __future__ import annotations
+import argparse
+import datetime
+import gc
+import importlib.metadata
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable
+
+from .tone_reader import ToneReader, ADDED, REMOVED
+from .tone_player import TonePlayer, MultiTonePlayer
+from .tone_renderer import ToneRenderer
+from .translator import best_pair, best_pairs, chord_arrays, loss, best_bulk_tune
+from .pipeline import timed_tone_sets, main_and_extras
+from .util import lazy_import
+
+np = lazy_import("numpy")
+mido = lazy_import("mido")
+
+@dataclass
+class Workload:
+    length: float = 60.0
+    """Duration of the synthetic song, in seconds."""
+    polyphony: int = 3
+    """Number of notes in each chord."""
+    chords_per_second: float = 4.0
+    pitchbends_per_second: float = 20.0
+    seed: int = 0
+
+    def messages(self) -> list[mido.Message]:
+        """A single-channel message stream with `time` in seconds, as iterating a `mido.MidiFile` gives."""
+        rng = random.Random(self.seed)
+        events = []
+        t = 0.0
+        while t < self.length:
+            duration = 1 / self.chords_per_second
+            notes = rng.sample(range(48, 84), self.polyphony)
+            for note in notes:
+                events.append((t, mido.Message('note_on', note=note, velocity=rng.randint(40, 120))))
+                events.append((t + duration, mido.Message('note_off', note=note)))
+            t += duration
+        for _ in range(int(self.length * self.pitchbends_per_second)):
+            events.append((rng.uniform(0, self.length), mido.Message('pitchwheel', pitch=rng.randint(-2048, 2047))))
+        events.sort(key=lambda event: event[0])
+
+        messages = []
+        last = 0.0
+        for when, msg in events:
+            messages.append(msg.copy(time=when - last))
+            last = when
+        return messages
+
+@dataclass
+class StageResult:
+    items: int
+    seconds: float
+    items_per_second: float
+    peak_bytes: int
+    allocated_blocks: int
+    """Net memory blocks allocated by a run of the stage, from `tracemalloc` snapshots taken around it:
+      what the stage leaves allocated, such as the entries it adds to caches."""
+
+def measure(run: Callable[[], int], repeat: int) -> StageResult:
+    """Time the best of `repeat` runs of a stage, then run it once more with tracing to measure memory and allocations.
+    `run` returns the number of items it processed."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = run()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak() # exclude the snapshot itself
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    blocks = sum(stat.count_diff for stat in after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'filename'))
+
+    return StageResult(items, best, items / best if best else float('inf'), peak, blocks)
+
+def stages(workload: Workload) -> dict[str, Callable[[], int]]:
+    messages = workload.messages()
+    chords = [main_and_extras(tones) for _, tones in timed_tone_sets(messages, ToneReader()) if tones]
+    pairs = [best_pair(main, extras)[1] for main, extras in chords[:200]]
+    targets = [(main, extras[0]) if extras else (main, main + 7) for main, extras in chords[:200]]
+    tones = [main for main, _ in chords]
+
+    def reader_tones():
+        for _ in ToneReader().messages_to_tones(messages):
+            pass
+        return len(messages)
+
+    def reader_changes():
+        for _ in ToneReader().messages_to_changes(messages):
+            pass
+        return len(messages)
+
+    def translator_best_pair():
+        for main, extras in chords:
+            best_pair(main, extras)
+        return len(chords)
+
+    arrays = chord_arrays(chords)
+
+    def translator_best_pairs():
+        best_pairs(*arrays)
+        return len(chords)
+
+    def translator_loss():
+        for target, pair in zip(targets, pairs):
+            loss(target, pair)
+            best_bulk_tune(target, pair)
+        return len(targets)
+
+    def tone_arithmetic():
+        for tone in tones:
+            (tone + 0.5) - tone
+            tone * 1.5
+        return len(tones)
+
+    def player_notes():
+        player = TonePlayer()
+        for tone in tones:
+            for _ in player.note_on(tone):
+                pass
+            for _ in player.note_off():
+                pass
+        return len(tones)
+
+    changes = [change for change in ToneReader().messages_to_changes(messages) if change.kind in (ADDED, REMOVED)]
+
+    def player_polyphonic():
+        player = MultiTonePlayer()
+        for change in changes:
+            if change.kind == ADDED:
+                for _ in player.note_on(change.tone, key=change.note):
+                    pass
+            else:
+                for _ in player.note_off(change.note):
+                    pass
+        return len(changes)
+
+    def renderer_seconds():
+        renderer = ToneRenderer()
+        timed = [(i / workload.chords_per_second, list(pair)) for i, pair in enumerate(pairs)]
+        samples = sum(len(block) for block in renderer.render(timed))
+        return samples // renderer.sample_rate
+
+    return {
+        'reader.messages_to_tones': reader_tones,
+        'reader.messages_to_changes': reader_changes,
+        'translator.best_pair': translator_best_pair,
+        'translator.best_pairs': translator_best_pairs,
+        'translator.loss+best_bulk_tune': translator_loss,
+        'tone.arithmetic': tone_arithmetic,
+        'player.note_on+note_off': player_notes,
+        'player.polyphonic': player_polyphonic,
+        'renderer.seconds': renderer_seconds,
+    }
+
+cold_starts: dict[str, str] = {
+    'import.dtmf_synth': "import dtmf_synth",
+    'import.translator': "import dtmf_synth.translator",
+    'import.pipeline': "import dtmf_synth.pipeline",
+    'import.cli': "import dtmf_synth.__main__",
+    'import.translator+best_pair': "from dtmf_synth.translator import best_pair; from dtmf_synth.tone import Tone; best_pair(Tone(note=60), [Tone(note=64)])",
+}
+
+def cold_start(code: str, repeat: int) -> float:
+    """The best time, in seconds, to run `code` in a fresh interpreter, excluding the interpreter's own startup."""
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [package_dir, os.environ.get('PYTHONPATH')]))}
+    timed = f"import time as _t; _start = _t.perf_counter()\n{code}\nprint(_t.perf_counter() - _start)"
+    return min(
+        float(subprocess.run([sys.executable, '-c', timed], capture_output=True, text=True, check=True, env=env, cwd=package_dir).stdout)
+        for _ in range(repeat)
+    )
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def package_version(name: str) -> str | None:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+def run(workload: Workload, repeat: int = 3, only: list[str] | None = None) -> dict:
+    selected = lambda name: not only or any(name.startswith(prefix) for prefix in only)
+    results = {}
+    for name, stage in stages(workload).items():
+        if selected(name):
+            results[name] = asdict(measure(stage, repeat))
+    imports = {name: cold_start(code, max(repeat, 5)) for name, code in cold_starts.items() if selected(name)}
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'mido': package_version('mido'),
+            'workload': asdict(workload),
+            'repeat': repeat,
+        },
+        'results': results,
+        'imports': imports,
+    }
+
+def print_results(report: dict):
+    for name, result in report['results'].items():
+        print(f"{name:34} {result['items_per_second']:14.1f}/s  {result['peak_bytes'] / 1024:10.1f} KiB peak  {result['allocated_blocks']:8d} blocks")
+    for name, seconds in report.get('imports', {}).items():
+        print(f"{name:34} {seconds * 1000:14.1f} ms")
+
+def compare(before: dict, after: dict):
+    """Print the throughput of each stage in two reports, and the speedup from the first to the second."""
+    for name in [name for name in before['results'] if name in after['results']]:
+        a, b = before['results'][name]['items_per_second'], after['results'][name]['items_per_second']
+        print(f"{name:34} {a:14.1f}/s -> {b:14.1f}/s  {b / a:6.2f}x")
+    before_imports, after_imports = before.get('imports', {}), after.get('imports', {})
+    for name in [name for name in before_imports if name in after_imports]:
+        a, b = before_imports[name], after_imports[name]
+        print(f"{name:34} {a * 1000:14.1f}ms -> {b * 1000:13.1f}ms  {a / b:6.2f}x")
+    if before['meta']['workload'] != after['meta']['workload']:
+        print("warning: the reports used different workloads", file=sys.stderr)
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m dtmf_synth.benchmark", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--length", type=float, default=Workload.length, help="song length in seconds")
+    parser.add_argument("--polyphony", type=int, default=Workload.polyphony, help="notes per chord")
+    parser.add_argument("--chords-per-second", type=float, default=Workload.chords_per_second)
+    parser.add_argument("--pitchbends-per-second", type=float, default=Workload.pitchbends_per_second)
+    parser.add_argument("--seed", type=int, default=Workload.seed)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the best is reported")
+    parser.add_argument("--only", nargs="*", help="only run stages whose names start with these prefixes")
+    parser.add_argument("-o", "--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two saved results instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            compare(json.load(f), json.load(g))
+        return
+
+    workload = Workload(args.length, args.polyphony, args.chords_per_second, args.pitchbends_per_second, args.seed)
+    report = run(workload, args.repeat, args.only)
+    print_results(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import itertools
+from typing import Generic, Sequence
+
+from .tone import Tone
+from .translator import K
+from . import phone_chords
+from .util import lazy_import
+
+np = lazy_import("numpy")
+
+__all__ = ["ChordIndex", "phone_tone_bank"]
+
+# `loss` is a squared Euclidean distance in disguise. Writing m for a chord's weighted mean note,
+#   sum(w * (a - b)**2) == sum(w * ((a - m_a) - (b - m_b))**2) + sum(w) * (m_a - m_b)**2,
+#   and the interval term is already a sum of squared differences of sqrt(weight) * |interval|.
+# So each chord maps to a point whose squared distance to another chord's point is exactly their `loss`,
+#   and dropping the mean coordinate gives `tuned_loss`, which is transposition-invariant.
+# Nearest-neighbour search over these points is then an exact argmin of the loss.
+
+def chord_embedding(notes: np.ndarray, tone_weights: np.ndarray, interval_weights: np.ndarray, tuned: bool) -> np.ndarray:
+    """Points whose squared distances are the `tuned_loss` (or `loss`, if not `tuned`) between chords, shape (chord, dimension)."""
+    mean = (notes * tone_weights).sum(axis=1) / tone_weights.sum()
+    parts = [(notes - mean[:, None]) * np.sqrt(tone_weights)]
+    symmetric = interval_weights + interval_weights.T # loss counts both (i, j) and (j, i)
+    for i, j in zip(*np.triu_indices(notes.shape[1], k=1)):
+        if symmetric[i, j]:
+            parts.append(np.sqrt(symmetric[i, j]) * np.abs(notes[:, i] - notes[:, j])[:, None])
+    if not tuned:
+        parts.append(np.sqrt(tone_weights.sum()) * mean[:, None])
+    return np.concatenate(parts, axis=1)
+
+class KDTree:
+    """A minimal k-d tree with exact branch-and-bound nearest-neighbour queries. Ties go to the lowest index."""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 32):
+        self.points = points
+        self.leaf_size = leaf_size
+        self.root = self.build(np.arange(len(points)))
+
+    def build(self, indices: np.ndarray) -> tuple:
+        points = self.points[indices]
+        lo, hi = points.min(axis=0), points.max(axis=0)
+        if len(indices) <= self.leaf_size:
+            return lo, hi, indices, None, None
+        dim = int(np.argmax(hi - lo))
+        order = np.argsort(points[:, dim], kind='stable')
+        half = len(indices) // 2
+        return lo, hi, None, self.build(indices[order[:half]]), self.build(indices[order[half:]])
+
+    def nearest(self, point: np.ndarray) -> tuple[int, float]:
+        """The index of the nearest point and its squared distance."""
+        best_index, best_dist = -1, np.inf
+        stack = [self.root]
+        while stack:
+            lo, hi, indices, left, right = stack.pop()
+            bound = (np.maximum(lo - point, 0) ** 2 + np.maximum(point - hi, 0) ** 2).sum()
+            if bound > best_dist:
+                continue
+            if indices is not None:
+                dist = ((self.points[indices] - point) ** 2).sum(axis=1)
+                i = int(np.argmin(dist))
+                if dist[i] < best_dist or (dist[i] == best_dist and indices[i] < best_index):
+                    best_index, best_dist = int(indices[i]), float(dist[i])
+            else:
+                # visit the child whose box is closer first, so the bound tightens sooner
+                near_left = (np.maximum(left[0] - point, 0) ** 2 + np.maximum(point - left[1], 0) ** 2).sum() \
+                    <= (np.maximum(right[0] - point, 0) ** 2 + np.maximum(point - right[1], 0) ** 2).sum()
+                stack.extend((right, left) if near_left else (left, right))
+        return best_index, best_dist
+
+class ChordIndex(Generic[K]):
+    """An index over a bank of candidate chords, for exact `best_match_for_chord` and `best_match_for_tuned_chord` queries
+      that don't scan every candidate. Chords of different sizes may be mixed; a query only considers candidates of its own size.
+    """
+
+    def __init__(self, chords: dict[K, Sequence[Tone]], tone_weights: Sequence[float] | None = None, interval_weights: np.ndarray | None = None, leaf_size: int = 32):
+        self.chords = chords
+        self.tone_weights = tone_weights
+        self.interval_weights = interval_weights
+        self.keys: dict[int, list[K]] = {}
+        self.trees: dict[tuple[int, bool], KDTree] = {}
+
+        by_size: dict[int, list[K]] = {}
+        for k, chord in chords.items():
+            by_size.setdefault(len(chord), []).append(k)
+        for size, keys in by_size.items():
+            notes = np.array([[tone.note for tone in chords[k]] for k in keys], dtype=float)
+            tone_weights, interval_weights = self.weights(size)
+            self.keys[size] = keys
+            for tuned in (False, True):
+                self.trees[size, tuned] = KDTree(chord_embedding(notes, tone_weights, interval_weights, tuned), leaf_size)
+
+    def weights(self, size: int) -> tuple[np.ndarray, np.ndarray]:
+        tone_weights = np.ones(size) if self.tone_weights is None else np.asarray(self.tone_weights, dtype=float)
+        interval_weights = np.tri(size, k=-1) if self.interval_weights is None else np.asarray(self.interval_weights, dtype=float)
+        if np.any(tone_weights < 0) or np.any(interval_weights < 0):
+            raise ValueError("ChordIndex requires non-negative weights")
+        return tone_weights, interval_weights
+
+    def query(self, chord: Sequence[Tone], tuned: bool) -> tuple[K, float]:
+        size = len(chord)
+        if size not in self.keys:
+            raise KeyError(f"no candidate chords with {size} tones")
+        notes = np.array([[tone.note for tone in chord]], dtype=float)
+        point = chord_embedding(notes, *self.weights(size), tuned)[0]
+        i, dist = self.trees[size, tuned].nearest(point)
+        return self.keys[size][i], dist
+
+    def best_match_for_chord(self, chord: Sequence[Tone]) -> K:
+        """Same result as `translator.best_match_for_chord(chord, self.chords, ...)` with this index's weights."""
+        return self.query(chord, tuned=False)[0]
+
+    def best_match_for_tuned_chord(self, chord: Sequence[Tone]) -> K:
+        """Same result as `translator.best_match_for_tuned_chord(chord, self.chords, ...)` with this index's weights."""
+        return self.query(chord, tuned=True)[0]
+
+def phone_tone_bank(sizes: Sequence[int] = (3, 4)) -> dict[str, tuple[Tone, ...]]:
+    """Every ordering of every combination of distinct telephone tones (DTMF and call progress) of the given sizes."""
+    named = {f"dtmf_{tone.freq:g}": tone for tone in phone_chords.dtmf_l + phone_chords.dtmf_h}
+    for name in ("dial_US", "busy_US", "ring_US", "dial_UK", "dial_EU", "dial_FR", "dial_JP"):
+        for tone in getattr(phone_chords, name):
+            named.setdefault(f"tone_{tone.freq:g}", tone)
+    return {
+        "+".join(names): tuple(named[name] for name in names)
+        for size in sizes
+        for names in itertools.permutations(named, size)
+    }
@@ -0,0 +1,128 @@
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Iterable, Generator, NamedTuple, Sequence
+
+from .tone import Tone
+from .phone_chords import dtmf_l, dtmf_h, dtmf_keypad
+from .wav import wav_blocks
+from .util import lazy_import
+
+np = lazy_import("numpy")
+
+__all__ = ["DecodedKey", "DtmfDecoder", "decode_wav"]
+
+class DecodedKey(NamedTuple):
+    start: float
+    """Start of the first window containing the key, in seconds."""
+    end: float
+    """End of the last window containing the key, in seconds."""
+    key: str
+    """The keypad character, from `dtmf_keypad`."""
+    detune: float
+    """The detune, in semitones, of the filters that matched best in any window of the key."""
+
+@dataclass
+class DtmfDecoder:
+    """Detects DTMF keys in PCM audio with a bank of Goertzel filters over a sliding window.
+    Each window is evaluated for all eight DTMF frequencies, at each of the semitone offsets in `detunes`, in one matrix product;
+      this gives the same filter outputs as running the Goertzel recurrence per frequency.
+    Blocks of any size can be fed in; windows that span block boundaries are carried over.
+    """
+    sample_rate: int = 44100
+    window_time: float = 0.025
+    hop_time: float = 0.0125
+    detunes: Sequence[float] = (0.0,)
+    """Semitone offsets of the filter bank, to detect pairs retuned by `translator.best_pair`."""
+    low_tones: list[Tone] = field(default_factory=lambda: dtmf_l)
+    high_tones: list[Tone] = field(default_factory=lambda: dtmf_h)
+    min_level: float = 1e-4
+    """Minimum mean power of a window, below which it is treated as silence."""
+    min_ratio: float = 0.5
+    """Minimum fraction of a window's energy that the detected pair must account for."""
+    min_windows: int = 2
+    """Minimum number of consecutive windows a key must be present to be reported."""
+
+    def __post_init__(self):
+        self.window = round(self.window_time * self.sample_rate)
+        self.hop = max(round(self.hop_time * self.sample_rate), 1)
+        base = np.array([tone.freq for tone in self.low_tones + self.high_tones])
+        self.freqs = base[None, :] * 2 ** (np.asarray(self.detunes, dtype=float)[:, None] / 12) # (detune, tone)
+        n = np.arange(self.window)
+        self.kernel = np.exp(-2j * np.pi * n[:, None] * self.freqs.ravel()[None, :] / self.sample_rate) # (sample, filter)
+
+        self.carry = np.zeros(0)
+        self.position = 0 # index of the first sample in carry
+        self.current = None # the key being accumulated, as (key, best detune, best score, first window, last window, window count)
+
+    def filter_powers(self, frames: np.ndarray) -> np.ndarray:
+        """Fraction of each frame's energy at each filter frequency, shape (frame, detune, tone)."""
+        outputs = frames @ self.kernel
+        energy = np.maximum((frames ** 2).sum(axis=1), 1e-30)
+        ratio = 2 * np.abs(outputs) ** 2 / (self.window * energy[:, None])
+        return ratio.reshape(len(frames), *self.freqs.shape)
+
+    def classify(self, frames: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The keypad index (row * 4 + column, or -1 for none), detune index, and pair energy fraction of each frame."""
+        powers = self.filter_powers(frames)
+        n_low = len(self.low_tones)
+        low, high = powers[:, :, :n_low], powers[:, :, n_low:]
+        row, col = low.argmax(axis=2), high.argmax(axis=2) # (frame, detune)
+        pair = np.take_along_axis(low, row[..., None], 2)[..., 0] + np.take_along_axis(high, col[..., None], 2)[..., 0]
+        detune = pair.argmax(axis=1)
+        frame_index = np.arange(len(frames))
+        score = pair[frame_index, detune]
+        keys = row[frame_index, detune] * len(self.high_tones) + col[frame_index, detune]
+        level = (frames ** 2).mean(axis=1)
+        keys[(score < self.min_ratio) | (level < self.min_level)] = -1
+        return keys, detune, score
+
+    def feed(self, samples: np.ndarray) -> Generator[DecodedKey, None, None]:
+        """Process the next block of mono samples, yielding the keys that ended within it."""
+        buffer = np.concatenate([self.carry, np.asarray(samples, dtype=float)])
+        if len(buffer) < self.window:
+            self.carry = buffer
+            return
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, self.window)[::self.hop]
+        keys, detunes, scores = self.classify(frames)
+
+        for i, (key, detune, score) in enumerate(zip(keys.tolist(), detunes.tolist(), scores.tolist())):
+            start = self.position + i * self.hop
+            if self.current is not None and self.current[0] == key:
+                _, best_detune, best_score, first, _, count = self.current
+                if score > best_score:
+                    best_detune, best_score = detune, score
+                self.current = (key, best_detune, best_score, first, start, count + 1)
+            else:
+                yield from self.flush()
+                if key >= 0:
+                    self.current = (key, detune, score, start, start, 1)
+
+        consumed = len(frames) * self.hop
+        self.carry = buffer[consumed:]
+        self.position += consumed
+
+    def flush(self) -> Generator[DecodedKey, None, None]:
+        """Report the key in progress, if any. Call at the end of the input."""
+        if self.current is not None:
+            key, detune, _, first, last, count = self.current
+            self.current = None
+            if count >= self.min_windows:
+                n_high = len(self.high_tones)
+                yield DecodedKey(
+                    start=first / self.sample_rate,
+                    end=(last + self.window) / self.sample_rate,
+                    key=dtmf_keypad[key // n_high][key % n_high],
+                    detune=float(self.detunes[detune]),
+                )
+
+    def decode(self, blocks: Iterable[np.ndarray]) -> Generator[DecodedKey, None, None]:
+        for block in blocks:
+            yield from self.feed(block)
+        yield from self.flush()
+
+def decode_wav(path: str, block_size: int = 1 << 16, channel: int | None = None, **kwargs) -> list[DecodedKey]:
+    """Decode a WAV file chunk by chunk; `kwargs` configure the `DtmfDecoder`."""
+    sample_rate, blocks = wav_blocks(path, block_size, channel)
+    decoder = DtmfDecoder(sample_rate=sample_rate, **kwargs)
+    return list(decoder.decode(blocks))
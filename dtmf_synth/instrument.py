@@ -0,0 +1,113 @@
+"""
+Lightweight counters and timers for the translation pipeline.
+
+Instrumentation is off by default; while `enabled` is False, instrumented code pays for little more than
+  one global lookup per call. Enable it with `enable()`, then read the totals with `snapshot()`,
+  or `register` a callback to receive a snapshot whenever `publish` is called (the batch pipeline publishes once per file).
+
+Counter names are dotted by stage, e.g. "translator.best_pair.calls", "translator.best_pair.seconds", "cache.hits".
+Generator stages additionally count the items they yield, and for MIDI messages, the bytes those messages encode to.
+"""
+from __future__ import annotations
+import functools
+import time
+from collections import defaultdict
+from typing import Any, Callable, Generator, TypeVar
+
+__all__ = ["enabled", "enable", "disable", "reset", "count", "add_time", "timed", "timed_generator", "snapshot", "register", "unregister", "publish"]
+
+F = TypeVar('F', bound=Callable)
+
+enabled: bool = False
+counters: defaultdict[str, float] = defaultdict(int)
+callbacks: list[Callable[[dict[str, float], dict[str, Any]], None]] = []
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    counters.clear()
+
+def count(name: str, n: int = 1):
+    """Add to a counter. Hot paths should check `instrument.enabled` before calling this."""
+    counters[name] += n
+
+def add_time(name: str, seconds: float):
+    counters[name + ".calls"] += 1
+    counters[name + ".seconds"] += seconds
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorate a function to count its calls and the time spent in them while instrumentation is enabled."""
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                add_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def timed_generator(name: str, message_bytes: bool = False) -> Callable[[F], F]:
+    """Decorate a generator function to count its calls, the items it yields, and the time spent producing them,
+      excluding the time the consumer spends between items.
+    With `message_bytes`, also count the encoded size of the yielded MIDI messages.
+    """
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            gen = fn(*args, **kwargs)
+            if not enabled:
+                return gen
+            return instrumented(gen)
+
+        def instrumented(gen: Generator) -> Generator:
+            elapsed = 0.0
+            items = 0
+            size = 0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(gen)
+                    except StopIteration as stop:
+                        return stop.value
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    items += 1
+                    if message_bytes:
+                        size += len(item.bin())
+                    yield item
+            finally:
+                add_time(name, elapsed)
+                counters[name + ".items"] += items
+                if message_bytes:
+                    counters[name + ".bytes"] += size
+        return wrapper
+    return decorate
+
+def snapshot() -> dict[str, float]:
+    """A copy of the current counters."""
+    return dict(counters)
+
+def register(callback: Callable[[dict[str, float], dict[str, Any]], None]):
+    """Call `callback(snapshot, context)` on every `publish`."""
+    callbacks.append(callback)
+
+def unregister(callback: Callable[[dict[str, float], dict[str, Any]], None]):
+    callbacks.remove(callback)
+
+def publish(**context) -> dict[str, float]:
+    """Send a snapshot to the registered callbacks, with `context` describing what it covers, and return it."""
+    data = snapshot()
+    for callback in callbacks:
+        callback(data, context)
+    return data
@@ -0,0 +1,182 @@
+
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncGenerator, Callable
+
+from .tone import Tone
+from .tone_reader import ToneReader
+from .tone_player import MultiTonePlayer
+from .translator import best_pair
+from .pair_cache import BestPairCache
+from .midi_optimizer import MidiOutputOptimizer
+from .pipeline import main_and_extras
+from .util import lazy_import
+
+np = lazy_import("numpy")
+mido = lazy_import("mido")
+
+__all__ = ["MidiBridge", "LoopbackPort", "port_messages"]
+
+class LoopbackPort(mido.ports.BaseIOPort):
+    """An in-process port that receives whatever is sent to it, for testing a `MidiBridge` without MIDI hardware."""
+    def _send(self, msg: mido.Message):
+        self._messages.append(msg)
+
+async def port_messages(port: mido.ports.BaseInput, poll_interval: float = 0.0005) -> AsyncGenerator[tuple[float, mido.Message], None]:
+    """Receive messages from a mido input port without blocking the event loop, stamped with their `time.perf_counter()` arrival.
+    Uses the port's callback where the backend supports one, and polls it otherwise. Runs until the port is closed.
+    """
+    if isinstance(getattr(type(port), 'callback', None), property):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[tuple[float, mido.Message]] = asyncio.Queue()
+        port.callback = lambda msg: loop.call_soon_threadsafe(queue.put_nowait, (time.perf_counter(), msg))
+        try:
+            while not port.closed:
+                yield await queue.get()
+        finally:
+            port.callback = None
+    else:
+        while not port.closed:
+            for msg in port.iter_pending():
+                yield time.perf_counter(), msg
+            await asyncio.sleep(poll_interval)
+
+@dataclass
+class MidiBridge:
+    """Translates a live MIDI stream to DTMF pairs in real time.
+    Each chord is matched with a `BestPairCache`. A cache miss is searched inline when that is expected to be quick,
+      and otherwise in `executor`, so the event loop keeps handling input.
+    If the search won't finish within `latency_budget` of the chord's arrival, the bridge falls back to `coarse_cache`,
+      which is keyed on a wider quantization, or else to the pair nearest the main note alone (a binary search);
+      the search still completes in the background and its result is cached for next time.
+    """
+    output: Any
+    """Anything with a `send(message)` method, such as a mido output port."""
+    channel: int = 0
+    """The input MIDI channel to translate."""
+    out_channels: tuple[int, int] = (0, 1)
+    latency_budget: float = 0.005
+    """Target time from a message's arrival to its output being sent, in seconds."""
+    inline_limit: float = 0.0005
+    """Searches expected to take longer than this, in seconds, are run in the executor."""
+    executor: Executor | None = None
+    """Executor for searches; None uses the event loop's default executor."""
+    clock: Callable[[], float] = time.perf_counter
+    """The clock that arrival times are read from, which also times searches and latencies."""
+
+    reader: ToneReader | None = None
+    cache: BestPairCache = field(default_factory=BestPairCache)
+    coarse_cache: BestPairCache = field(default_factory=lambda: BestPairCache(resolution=50))
+    optimizer: MidiOutputOptimizer = field(default_factory=MidiOutputOptimizer)
+
+    search_time: float = 0.0
+    """Moving average of the time an exact search takes, in seconds."""
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=100000))
+    counts: dict[str, int] = field(default_factory=lambda: {'cached': 0, 'exact': 0, 'coarse': 0, 'single': 0})
+
+    def __post_init__(self):
+        if self.reader is None:
+            self.reader = ToneReader(channel=self.channel)
+        self.player = MultiTonePlayer(self.out_channels)
+        self.pair = None
+        # the tables (and numpy) are otherwise loaded by the first search, which would blow the latency budget
+        for cache in (self.cache, self.coarse_cache):
+            cache.table.prepare()
+            cache.compute(Tone(note=69), [Tone(note=64)])
+        best_pair(Tone(note=69), [], self.cache.table)
+
+    def timed_search(self, main: Tone, extras: list[Tone]) -> tuple[tuple[int, int], float]:
+        start = self.clock()
+        entry = self.cache.compute(main, extras)
+        return entry, self.clock() - start
+
+    def searched(self, main: Tone, extras: list[Tone], entry: tuple[int, int], elapsed: float):
+        self.search_time = elapsed if not self.search_time else 0.9 * self.search_time + 0.1 * elapsed
+        self.cache.store(main, extras, entry)
+        self.coarse_cache.store(main, extras, entry)
+
+    async def match(self, main: Tone, extras: list[Tone], deadline: float) -> tuple[Tone, Tone]:
+        """The pair to play for this chord."""
+        if not extras:
+            return best_pair(main, extras, self.cache.table)[1]
+
+        entry = self.cache.lookup(main, extras)
+        if entry is not None:
+            self.counts['cached'] += 1
+            return self.cache.resolve(main, extras, entry)[1]
+
+        if self.search_time <= self.inline_limit and self.clock() + self.search_time <= deadline:
+            entry, elapsed = self.timed_search(main, extras)
+            self.searched(main, extras, entry, elapsed)
+            self.counts['exact'] += 1
+            return self.cache.resolve(main, extras, entry)[1]
+
+        loop = asyncio.get_running_loop()
+        search = loop.run_in_executor(self.executor, self.timed_search, main, extras)
+        try:
+            entry, elapsed = await asyncio.wait_for(asyncio.shield(search), timeout=max(deadline - self.clock(), 0))
+        except asyncio.TimeoutError:
+            def finished(done: asyncio.Future):
+                if not done.cancelled() and done.exception() is None:
+                    self.searched(main, extras, *done.result())
+            search.add_done_callback(finished)
+        else:
+            self.searched(main, extras, entry, elapsed)
+            self.counts['exact'] += 1
+            return self.cache.resolve(main, extras, entry)[1]
+
+        entry = self.coarse_cache.lookup(main, extras)
+        if entry is not None:
+            self.counts['coarse'] += 1
+            return self.coarse_cache.resolve(main, extras, entry)[1]
+        self.counts['single'] += 1
+        return best_pair(main, [], self.cache.table)[1]
+
+    def play(self, pair: tuple[Tone, Tone] | None):
+        messages = list(self.player.all_notes_off())
+        if pair is not None:
+            for tone in pair:
+                messages.extend(self.player.note_on(tone))
+        for msg in self.optimizer.filter(messages, flush=False):
+            self.output.send(msg)
+
+    async def update(self, arrival: float):
+        tones = self.reader.current_tones()
+        if not tones:
+            pair = None
+        else:
+            main, extras = main_and_extras(tones)
+            pair = await self.match(main, extras, arrival + self.latency_budget)
+            velocity = main.meta.get('velocity', 64)
+            pair = tuple(Tone(note=tone.note, meta={'velocity': velocity}) for tone in pair)
+        if pair != self.pair:
+            self.pair = pair
+            self.play(pair)
+        self.latencies.append(self.clock() - arrival)
+
+    async def run(self, messages: AsyncIterable[tuple[float, mido.Message]]):
+        """Translate `(arrival time, message)` pairs, such as from `port_messages`, until they run out."""
+        for msg in self.optimizer.filter(self.player.reset(), flush=False):
+            self.output.send(msg)
+        try:
+            async for arrival, msg in messages:
+                changed = False
+                for _ in self.reader.apply_message(msg):
+                    changed = True
+                if changed:
+                    await self.update(arrival)
+        finally:
+            self.play(None)
+            for msg in self.optimizer.flush():
+                self.output.send(msg)
+
+    def latency_percentiles(self, percentiles: tuple[float, ...] = (50, 99)) -> dict[str, float]:
+        """Input-to-output latency percentiles of the recent chords, in seconds, keyed as 'p50', 'p99', etc."""
+        if not self.latencies:
+            return {f"p{p:g}": float('nan') for p in percentiles}
+        values = np.percentile(np.fromiter(self.latencies, dtype=float), percentiles)
+        return {f"p{p:g}": float(v) for p, v in zip(percentiles, values)}
@@ -0,0 +1,181 @@
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Iterable, Generator, TypeVar
+
+from .midi_constants import *
+from . import instrument
+from .util import lazy_import
+
+mido = lazy_import("mido")
+
+T = TypeVar('T')
+
+RPN_NULL_ADDR = (0x7f, 0x7f)
+CHANNEL_MODE_CONTROLS = 120 # controls from here up are channel mode messages, which act on every send
+
+@dataclass
+class MidiOutputOptimizer:
+    """A filter that drops MIDI messages which would not change the receiving device's state.
+    It tracks, per channel, the controller values, pitchwheel position, and RPN address and values the device has been sent.
+    RPN address changes are deferred until a data entry needs them, so consecutive data entries to one parameter share
+      a single address selection and the RPN null that `TonePlayer` sends after each parameter is only sent once, on `flush`.
+    `encode` additionally uses running status when writing raw bytes.
+    """
+    close_rpn: bool = True
+    """Whether `flush` sends an RPN null to close any address left open on the device."""
+    note_off_as_note_on: bool = False
+    """Whether `encode` sends velocity-64 note_off messages as velocity-0 note_on, which lets more of them share a running status."""
+
+    controls: dict[tuple[int, int], int] = field(default_factory=dict)
+    """Last value sent for each (channel, control)."""
+    pitchwheel: dict[int, int] = field(default_factory=dict)
+    device_rpn_addr: dict[int, list[int | None]] = field(default_factory=dict)
+    """The (hi, lo) RPN address selected on the device for each channel, with None for unknown."""
+    rpn_addr: dict[int, list[int] | None] = field(default_factory=dict)
+    """The (hi, lo) RPN address the input stream has selected for each channel, or None if it selected an NRPN."""
+    rpn_values: dict[tuple[int, tuple[int, int], int], int] = field(default_factory=dict)
+    """Last value sent for each (channel, RPN address, data entry control)."""
+
+    pending_time: float = 0
+    """Delta time of dropped messages, to be added to the next message sent."""
+    running_status: int | None = None
+
+    messages_in: int = 0
+    messages_out: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_in - self.bytes_out
+
+    def send(self, msg: mido.Message) -> mido.Message:
+        out = msg.copy(time=msg.time + self.pending_time) if self.pending_time else msg
+        self.pending_time = 0
+        size = len(out.bin())
+        self.messages_out += 1
+        self.bytes_out += size
+        if instrument.enabled:
+            instrument.count('output.messages')
+            instrument.count('output.bytes', size)
+        return out
+
+    def drop(self, msg: mido.Message):
+        self.pending_time += msg.time
+
+    def select_rpn(self, channel: int, time: float = 0) -> Generator[mido.Message, None, None]:
+        """Send whichever address bytes the device needs to match the requested RPN address."""
+        requested = self.rpn_addr.get(channel) or list(RPN_NULL_ADDR)
+        device = self.device_rpn_addr.setdefault(channel, [None, None])
+        for i, control in ((1, CTRL_RPN_ADDR_LO), (0, CTRL_RPN_ADDR_HI)):
+            if device[i] != requested[i]:
+                device[i] = requested[i]
+                yield self.send(mido.Message('control_change', channel=channel, control=control, value=requested[i], time=time))
+                time = 0
+
+    def process(self, msg: mido.Message) -> Generator[mido.Message, None, None]:
+        """Filter one message, yielding the messages (if any) to send in its place."""
+        self.messages_in += 1
+        self.bytes_in += len(msg.bin())
+
+        if msg.type == 'reset':
+            self.controls.clear()
+            self.pitchwheel.clear()
+            self.device_rpn_addr.clear()
+            self.rpn_addr.clear()
+            self.rpn_values.clear()
+            yield self.send(msg)
+        elif msg.type == 'pitchwheel':
+            if self.pitchwheel.get(msg.channel) == msg.pitch:
+                self.drop(msg)
+            else:
+                self.pitchwheel[msg.channel] = msg.pitch
+                yield self.send(msg)
+        elif msg.type == 'control_change':
+            yield from self.process_control(msg)
+        else:
+            yield self.send(msg)
+
+    def process_control(self, msg: mido.Message) -> Generator[mido.Message, None, None]:
+        channel, control, value = msg.channel, msg.control, msg.value
+
+        if control in (CTRL_RPN_ADDR_HI, CTRL_RPN_ADDR_LO):
+            requested = self.rpn_addr.get(channel) or list(RPN_NULL_ADDR)
+            requested[0 if control == CTRL_RPN_ADDR_HI else 1] = value
+            self.rpn_addr[channel] = requested
+            self.pending_time += msg.time # sent later by select_rpn, if a data entry needs it
+        elif control in (CTRL_UPN_ADDR_HI, CTRL_UPN_ADDR_LO):
+            self.rpn_addr[channel] = None
+            self.device_rpn_addr[channel] = [None, None] # selecting an NRPN deselects the RPN
+            yield self.send(msg)
+        elif control in (CTRL_DATA_ENTRY_HI, CTRL_DATA_ENTRY_LO, CTRL_DATA_BUTTON_INC, CTRL_DATA_BUTTON_DEC):
+            requested = self.rpn_addr.get(channel, list(RPN_NULL_ADDR))
+            if requested is None: # NRPN data isn't tracked
+                yield self.send(msg)
+                return
+            addr = tuple(requested)
+            key = (channel, addr, control)
+            if addr == RPN_NULL_ADDR or (control in (CTRL_DATA_ENTRY_HI, CTRL_DATA_ENTRY_LO) and self.rpn_values.get(key) == value):
+                self.drop(msg)
+                return
+            address = list(self.select_rpn(channel, msg.time))
+            yield from address
+            if control in (CTRL_DATA_BUTTON_INC, CTRL_DATA_BUTTON_DEC):
+                self.rpn_values.pop((channel, addr, CTRL_DATA_ENTRY_HI), None)
+                self.rpn_values.pop((channel, addr, CTRL_DATA_ENTRY_LO), None)
+            else:
+                self.rpn_values[key] = value
+            yield self.send(msg.copy(time=0) if address else msg)
+        elif control >= CHANNEL_MODE_CONTROLS:
+            yield self.send(msg)
+        elif self.controls.get((channel, control)) == value:
+            self.drop(msg)
+        else:
+            self.controls[(channel, control)] = value
+            yield self.send(msg)
+
+    def flush(self) -> Generator[mido.Message, None, None]:
+        """Close any RPN address left open on the device, if `close_rpn` is set."""
+        if not self.close_rpn:
+            return
+        for channel, device in self.device_rpn_addr.items():
+            if tuple(device) != RPN_NULL_ADDR:
+                self.rpn_addr[channel] = list(RPN_NULL_ADDR)
+                yield from self.select_rpn(channel)
+
+    def filter(self, messages: Iterable[mido.Message], flush: bool = True) -> Generator[mido.Message, None, None]:
+        """Filter a message stream, such as the output of a `TonePlayer` method.
+        Pass `flush=False` when filtering a stream in several parts, and call `flush` after the last one.
+        """
+        for msg in messages:
+            yield from self.process(msg)
+        if flush:
+            yield from self.flush()
+
+    def filter_timed(self, timed_messages: Iterable[tuple[T, mido.Message]], flush: bool = True) -> Generator[tuple[T, mido.Message], None, None]:
+        """Like `filter`, for `(time, message)` pairs with absolute times."""
+        time = None
+        for time, msg in timed_messages:
+            for out in self.process(msg):
+                yield time, out
+        if flush:
+            for out in self.flush():
+                yield time, out
+
+    def encode(self, messages: Iterable[mido.Message], flush: bool = True) -> Generator[bytes, None, None]:
+        """Filter a message stream and encode it as raw MIDI bytes with running status, one chunk per message."""
+        for msg in self.filter(messages, flush):
+            self.bytes_out -= len(msg.bin())
+            if self.note_off_as_note_on and msg.type == 'note_off' and msg.velocity == 64:
+                msg = mido.Message('note_on', channel=msg.channel, note=msg.note, velocity=0, time=msg.time)
+            data = msg.bin()
+            status = data[0]
+            if status < 0xf0:
+                if status == self.running_status:
+                    data = data[1:]
+                self.running_status = status
+            elif status < 0xf8: # system common messages cancel running status; realtime messages don't
+                self.running_status = None
+            self.bytes_out += len(data)
+            yield bytes(data)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import json
+import math
+
+from .tone import Tone
+from .translator import K, ChordTable, as_chord_table, best_pair, dtmf_all_table, pair_tone_weights
+from .util import lazy_import
+
+np = lazy_import("numpy")
+
+__all__ = ["NoteGrid"]
+
+@dataclass
+class NoteGrid:
+    """A precomputed `best_pair` selection for every (main note, interval) cell of a regular grid.
+    Built offline with `build` and saved as a `.npy` array of candidate indices plus a `.json` sidecar describing the grid;
+      `load` memory-maps the array, so startup costs no more than opening the file.
+    Inputs whose main note or intervals fall off the grid use the exact search instead.
+    """
+    table: ChordTable[K]
+    candidates: np.ndarray
+    """Index into `table.keys` of the best untuned match, shape (main, interval)."""
+    main_min: int = 0
+    interval_min: int = -48
+    steps_per_semitone: int = 8
+
+    @property
+    def main_max(self) -> float:
+        return self.main_min + (self.candidates.shape[0] - 1) / self.steps_per_semitone
+
+    @property
+    def interval_max(self) -> float:
+        return self.interval_min + (self.candidates.shape[1] - 1) / self.steps_per_semitone
+
+    @classmethod
+    def build(cls, pairs: dict[K, tuple[Tone, Tone]] | ChordTable[K] = dtmf_all_table, main_range: tuple[int, int] = (0, 127), interval_range: tuple[int, int] = (-48, 48), steps_per_semitone: int = 8) -> NoteGrid:
+        """Run the candidate search over every cell. Both ranges are inclusive, in semitones."""
+        table = as_chord_table(pairs)
+        main_notes = main_range[0] + np.arange((main_range[1] - main_range[0]) * steps_per_semitone + 1) / steps_per_semitone
+        intervals = interval_range[0] + np.arange((interval_range[1] - interval_range[0]) * steps_per_semitone + 1) / steps_per_semitone
+        dtype = np.uint8 if len(table) <= 0x100 else np.uint16
+
+        # the interval part of the loss is the same on every row, so only the per-tone part is recomputed per main note
+        interval_loss = table.interval_losses(np.stack([np.zeros_like(intervals), intervals], axis=-1))
+        candidates = np.empty((len(main_notes), len(intervals)), dtype=dtype)
+        for i, main_note in enumerate(main_notes):
+            targets = np.stack([np.full_like(intervals, main_note), main_note + intervals], axis=-1)
+            losses = table.tone_losses(targets, pair_tone_weights) + interval_loss
+            candidates[i] = np.argmin(losses, axis=1)
+
+        return cls(table, candidates, main_range[0], interval_range[0], steps_per_semitone)
+
+    def save(self, path: str):
+        """Write `<path>.npy` and `<path>.json`."""
+        np.save(path + ".npy", self.candidates)
+        with open(path + ".json", "w") as f:
+            json.dump({
+                "main_min": self.main_min,
+                "interval_min": self.interval_min,
+                "steps_per_semitone": self.steps_per_semitone,
+                "keys": [str(k) for k in self.table.keys],
+            }, f)
+
+    @classmethod
+    def load(cls, path: str, pairs: dict[K, tuple[Tone, Tone]] | ChordTable[K] = dtmf_all_table, mmap: bool = True) -> NoteGrid:
+        """Open a grid written by `save`. `pairs` must be the candidates the grid was built from."""
+        table = as_chord_table(pairs)
+        with open(path + ".json") as f:
+            header = json.load(f)
+        if header["keys"] != [str(k) for k in table.keys]:
+            raise ValueError(f"{path} was built for a different set of pairs")
+        candidates = np.load(path + ".npy", mmap_mode="r" if mmap else None)
+        return cls(table, candidates, header["main_min"], header["interval_min"], header["steps_per_semitone"])
+
+    def cell(self, note: float, minimum: int, size: int) -> int | None:
+        """The grid index of `note`, or None if it isn't exactly on the grid."""
+        pos = (note - minimum) * self.steps_per_semitone
+        i = round(pos)
+        if 0 <= i < size and math.isclose(pos, i, abs_tol=1e-6):
+            return i
+        return None
+
+    def lookup(self, main_note: float, interval: float) -> int | None:
+        """The index into `table.keys` of the best untuned match for (main, main + interval), or None if off the grid."""
+        i = self.cell(main_note, self.main_min, self.candidates.shape[0])
+        j = self.cell(interval, self.interval_min, self.candidates.shape[1])
+        if i is None or j is None:
+            return None
+        return int(self.candidates[i, j])
+
+    def best_pair(self, main: Tone, extras: list[Tone]) -> tuple[K, tuple[Tone, Tone]]:
+        """Equivalent of `translator.best_pair(main, extras, self.table)`, looking up candidates on the grid where possible."""
+        main_note = main.note
+        extra_notes = [extra.note for extra in extras]
+        candidates = [self.lookup(main_note, note - main_note) for note in extra_notes]
+        if not extras or None in candidates:
+            return best_pair(main, extras, self.table)
+
+        w_main, w_extra = pair_tone_weights
+        best = None
+        for extra_note, candidate in zip(extra_notes, candidates):
+            b_main, b_extra = self.table.notes[candidate]
+            tune = (w_main * (b_main - main_note) + w_extra * (b_extra - extra_note)) / (w_main + w_extra)
+            err = (w_main * (main_note + tune - b_main) ** 2
+                + w_extra * (extra_note + tune - b_extra) ** 2
+                + (abs(extra_note - main_note) - abs(b_extra - b_main)) ** 2)
+            if best is None or err < best[0]:
+                best = err, candidate, tune
+
+        _, candidate, tune = best
+        k = self.table.keys[candidate]
+        tuned = tuple(tone - tune for tone in self.table.chords[k])
+        return k, tuned
+
+    __call__ = best_pair
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Precompute a DTMF note grid for dtmf_synth.note_grid.NoteGrid.load")
+    parser.add_argument("path", help="output path, without extension")
+    parser.add_argument("--steps-per-semitone", type=int, default=8)
+    parser.add_argument("--main-range", type=int, nargs=2, default=(0, 127))
+    parser.add_argument("--interval-range", type=int, nargs=2, default=(-48, 48))
+    args = parser.parse_args()
+    NoteGrid.build(main_range=tuple(args.main_range), interval_range=tuple(args.interval_range), steps_per_semitone=args.steps_per_semitone).save(args.path)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import NamedTuple, Hashable
+
+from .tone import Tone
+from . import instrument
+from .translator import K, ChordTable, as_chord_table, best_pair, best_bulk_tune, dtmf_all_table, pair_tone_weights
+from .util import lazy_import
+
+np = lazy_import("numpy")
+
+__all__ = ["CacheInfo", "BestPairCache"]
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int | None
+    currsize: int
+
+@dataclass
+class BestPairCache:
+    """A memoizing front end for `translator.best_pair`.
+    Chords are keyed on their shape: the main note and the intervals from it to each extra, quantized to `resolution` cents.
+    A cached entry remembers which extra and which pair were selected;
+      the bulk tune is then recomputed for the exact input, so only inputs within the same quantization cell share a selection.
+    """
+    pairs: dict[K, tuple[Tone, Tone]] | ChordTable[K] = dtmf_all_table
+    resolution: float = 1.0
+    """Width of a quantization cell, in cents."""
+    maxsize: int | None = 4096
+    """Number of chord shapes to keep, evicting the least recently used. `None` keeps everything."""
+
+    hits: int = 0
+    misses: int = 0
+    entries: OrderedDict[Hashable, tuple[int, int]] = field(default_factory=OrderedDict, repr=False)
+
+    def __post_init__(self):
+        self.table = as_chord_table(self.pairs)
+
+    def shape_key(self, main_note: float, extra_notes: list[float]) -> tuple[int, tuple[int, ...]]:
+        scale = 100 / self.resolution
+        return round(main_note * scale), tuple(round((note - main_note) * scale) for note in extra_notes)
+
+    def best_pair(self, main: Tone, extras: list[Tone]) -> tuple[K, tuple[Tone, Tone]]:
+        """Cached equivalent of `translator.best_pair(main, extras, self.pairs)`."""
+        if not extras:
+            return best_pair(main, extras, self.table)
+
+        entry = self.lookup(main, extras)
+        if entry is None:
+            entry = self.compute(main, extras)
+            self.store(main, extras, entry)
+        return self.resolve(main, extras, entry)
+
+    def lookup(self, main: Tone, extras: list[Tone]) -> tuple[int, int] | None:
+        """The cached `(extra index, candidate index)` for this chord's shape, or None on a miss."""
+        key = self.shape_key(main.note, [extra.note for extra in extras])
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            if instrument.enabled:
+                instrument.count('cache.misses')
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            if instrument.enabled:
+                instrument.count('cache.hits')
+        return entry
+
+    def compute(self, main: Tone, extras: list[Tone]) -> tuple[int, int]:
+        """Run the search for a chord, without touching the cache."""
+        main_note = main.note
+        targets = np.array([(main_note, extra.note) for extra in extras])
+        target, candidate, _ = self.table.best_match(targets, pair_tone_weights)
+        return target, candidate
+
+    def store(self, main: Tone, extras: list[Tone], entry: tuple[int, int]):
+        key = self.shape_key(main.note, [extra.note for extra in extras])
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if self.maxsize is not None and len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def resolve(self, main: Tone, extras: list[Tone], entry: tuple[int, int]) -> tuple[K, tuple[Tone, Tone]]:
+        """The selected key and its pair, tuned for this exact chord."""
+        target, candidate = entry
+        k = self.table.keys[candidate]
+        pair = self.table.chords[k]
+        tune = best_bulk_tune([main, extras[target]], pair, pair_tone_weights)
+        tuned = tuple(tone - tune for tone in pair)
+        return k, tuned
+
+    __call__ = best_pair
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
+
+    def cache_clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -1,28 +1,74 @@
 from __future__ import annotations
-import itertools
+from typing import Iterator, Mapping
 from .tone import Tone
 
-dtmf_l: list[Tone] = [
-    Tone(freq=697),
-    Tone(freq=770),
-    Tone(freq=852),
-    Tone(freq=941),
-]
-dtmf_h: list[Tone] = [
-    Tone(freq=1209),
-    Tone(freq=1336),
-    Tone(freq=1477),
-    Tone(freq=1633),
-]
+# The tables are stored as plain frequencies; `Tone` objects are only built when a table is first used.
+
+dtmf_low_freqs: tuple[int, ...] = (697, 770, 852, 941)
+dtmf_high_freqs: tuple[int, ...] = (1209, 1336, 1477, 1633)
 dtmf_keypad: list[str] = [
     "123A",
     "456B",
     "789C",
     "*0#D",
 ]
-dtmf_lh: dict[str, tuple[Tone, Tone]] = {"key_" + dtmf_keypad[i][j] + "_lh": (low, high) for ((i,low), (j,high)) in itertools.product(enumerate(dtmf_l), enumerate(dtmf_h)) }
-dtmf_hl: dict[str, tuple[Tone, Tone]] = {"key_" + dtmf_keypad[i][j] + "_hl": (high, low) for ((i,low), (j,high)) in itertools.product(enumerate(dtmf_l), enumerate(dtmf_h)) }
-dtmf: dict[str, tuple[Tone, Tone]] = {**dtmf_lh, **dtmf_hl}
+
+class ToneTable(Mapping[str, tuple[Tone, ...]]):
+    """An immutable mapping of names to chords, stored as tuples of frequencies.
+    Each chord's `Tone`s are built the first time it is looked up.
+    """
+    __slots__ = ('names', 'freqs', 'index', 'chords')
+
+    def __init__(self, names: tuple[str, ...], freqs: tuple[tuple[float, ...], ...]):
+        self.names = names
+        self.freqs = freqs
+        self.index = {name: i for i, name in enumerate(names)}
+        self.chords: dict[str, tuple[Tone, ...]] = {}
+
+    def __getitem__(self, name: str) -> tuple[Tone, ...]:
+        chord = self.chords.get(name)
+        if chord is None:
+            chord = self.chords[name] = tuple(Tone(freq=freq) for freq in self.freqs[self.index[name]])
+        return chord
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(zip(self.names, self.freqs))!r})"
+
+    def copy(self) -> dict[str, tuple[Tone, ...]]:
+        return dict(self)
+
+    def reversed(self, suffix: str = "_r") -> ToneTable:
+        """The same chords with their tones in reverse order, named with `suffix`."""
+        return ToneTable(tuple(name + suffix for name in self.names), tuple(freqs[::-1] for freqs in self.freqs))
+
+    def __or__(self, other: Mapping[str, tuple[Tone, ...]]) -> ToneTable | dict[str, tuple[Tone, ...]]:
+        """A `ToneTable` if `other` is one with no names in common, otherwise a dict, as for two dicts."""
+        if isinstance(other, ToneTable) and not self.index.keys() & other.index.keys():
+            return ToneTable(self.names + other.names, self.freqs + other.freqs)
+        if isinstance(other, Mapping):
+            return {**self, **other}
+        return NotImplemented
+
+    def __ror__(self, other: Mapping[str, tuple[Tone, ...]]) -> dict[str, tuple[Tone, ...]]:
+        if isinstance(other, Mapping):
+            return {**other, **self}
+        return NotImplemented
+
+dtmf_lh = ToneTable(
+    tuple("key_" + dtmf_keypad[i][j] + "_lh" for i in range(4) for j in range(4)),
+    tuple((low, high) for low in dtmf_low_freqs for high in dtmf_high_freqs),
+)
+dtmf_hl = ToneTable(
+    tuple("key_" + dtmf_keypad[i][j] + "_hl" for i in range(4) for j in range(4)),
+    tuple((high, low) for low in dtmf_low_freqs for high in dtmf_high_freqs),
+)
+dtmf = dtmf_lh | dtmf_hl
 
 def get_dtmf(key: str, low_tone_first: bool = True) -> tuple[Tone, Tone]:
     if key in dtmf:
@@ -32,11 +78,24 @@ def get_dtmf(key: str, low_tone_first: bool = True) -> tuple[Tone, Tone]:
         lookup = 'key_' + key + suffix
         return dtmf[lookup]
 
-dial_US = [Tone(freq=350), Tone(freq=440)]
-busy_US = [Tone(freq=480), Tone(freq=620)]
-ring_US = [Tone(freq=440), Tone(freq=480)]
+call_progress_freqs: dict[str, tuple[int, ...]] = {
+    "dial_US": (350, 440),
+    "busy_US": (480, 620),
+    "ring_US": (440, 480),
 
-dial_UK = [Tone(freq=350), Tone(freq=450)]
-dial_EU = [Tone(freq=425)]
-dial_FR = [Tone(freq=440)]
-dial_JP = [Tone(freq=400)]
+    "dial_UK": (350, 450),
+    "dial_EU": (425,),
+    "dial_FR": (440,),
+    "dial_JP": (400,),
+}
+
+def __getattr__(name: str) -> list[Tone]:
+    # `dtmf_l`, `dtmf_h` and the call progress tones, as lists of `Tone`, built on first use
+    if name in ("dtmf_l", "dtmf_h"):
+        freqs = dtmf_low_freqs if name == "dtmf_l" else dtmf_high_freqs
+    elif name in call_progress_freqs:
+        freqs = call_progress_freqs[name]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    tones = globals()[name] = [Tone(freq=freq) for freq in freqs]
+    return tones
@@ -0,0 +1,150 @@
+
+from __future__ import annotations
+from typing import Callable, Iterable, Generator
+
+from .tone import Tone
+from .tone_reader import ToneReader
+from .tone_player import MultiTonePlayer
+from .tone_renderer import ToneRenderer
+from .pair_cache import BestPairCache
+from .translator import K, ChordTable, as_chord_table, best_pairs, chord_arrays, dtmf_all_table
+from .midi_optimizer import MidiOutputOptimizer
+from .wav import WavWriter
+from . import instrument
+from .util import lazy_import
+
+np = lazy_import("numpy")
+mido = lazy_import("mido")
+
+__all__ = ["timed_tone_sets", "main_and_extras", "translate_tone_sets", "translate_tone_sets_batch", "pairs_to_messages", "write_midi", "write_wav", "convert_file"]
+
+Matcher = Callable[[Tone, list[Tone]], tuple[object, tuple[Tone, Tone]]]
+
+@instrument.timed_generator('reader.timed_tone_sets')
+def timed_tone_sets(messages: Iterable[mido.Message], reader: ToneReader) -> Generator[tuple[float, list[Tone]], None, None]:
+    """The reader's tone set after each message that changes it, with the absolute time of that message."""
+    time = 0
+    for msg in messages:
+        time += msg.time
+        changed = False
+        for _ in reader.apply_message(msg):
+            changed = True
+        if changed:
+            if instrument.enabled:
+                instrument.count('reader.tone_sets')
+            yield time, reader.current_tones()
+
+def main_and_extras(tones: list[Tone]) -> tuple[Tone, list[Tone]]:
+    """Split a tone set into the highest tone, taken as the main note, and the others as its chord tones."""
+    main = max(tones, key=lambda tone: tone.note)
+    return main, [tone for tone in tones if tone is not main]
+
+def translate_tone_sets(timed_tones: Iterable[tuple[float, list[Tone]]], matcher: Matcher) -> Generator[tuple[float, tuple[Tone, Tone] | None], None, None]:
+    """Replace each tone set with its best DTMF pair, or None for silence.
+    The tone sets are split with `main_and_extras`.
+    Consecutive identical pairs are only reported once.
+    """
+    last = None
+    for time, tones in timed_tones:
+        pair = None
+        if tones:
+            main, extras = main_and_extras(tones)
+            _, tuned = matcher(main, extras)
+            velocity = main.meta.get('velocity', 64)
+            pair = tuple(Tone(note=tone.note, meta={'velocity': velocity}) for tone in tuned)
+        if pair != last:
+            last = pair
+            yield time, pair
+
+def translate_tone_sets_batch(timed_tones: Iterable[tuple[float, list[Tone]]], pairs: dict[K, tuple[Tone, Tone]] | ChordTable[K] = dtmf_all_table, chunk_size: int = 4096) -> Generator[tuple[float, tuple[Tone, Tone] | None], None, None]:
+    """Same output as `translate_tone_sets(timed_tones, best_pair)`, but translates every tone set with one `best_pairs` call.
+    All the tone sets are read before the first result, so this suits whole files rather than streams.
+    """
+    table = as_chord_table(pairs)
+    times, chords, velocities = [], [], []
+    for time, tones in timed_tones:
+        times.append(time)
+        if tones:
+            chords.append(main_and_extras(tones))
+            velocities.append(chords[-1][0].meta.get('velocity', 64)) # read now, as the reader updates the meta in place
+        else:
+            velocities.append(None)
+    indices, tunes = best_pairs(*chord_arrays(chords), pairs=table, chunk_size=chunk_size)
+    results = zip(indices.tolist(), tunes.tolist())
+
+    last = None
+    for time, velocity in zip(times, velocities):
+        pair = None
+        if velocity is not None:
+            i, tune = next(results)
+            pair = tuple(Tone(note=tone.note - tune, meta={'velocity': velocity}) for tone in table.chords[table.keys[i]])
+        if pair != last:
+            last = pair
+            yield time, pair
+
+def pairs_to_messages(timed_pairs: Iterable[tuple[float, tuple[Tone, Tone] | None]], channels: tuple[int, int] = (0, 1)) -> Generator[tuple[float, mido.Message], None, None]:
+    """Play each pair with a `MultiTonePlayer` over `channels`, yielding `(time, message)` with absolute times."""
+    player = MultiTonePlayer(channels)
+    time = 0
+    for msg in player.reset():
+        yield time, msg
+    for time, pair in timed_pairs:
+        for msg in player.all_notes_off():
+            yield time, msg
+        if pair is not None:
+            for tone in pair:
+                for msg in player.note_on(tone):
+                    yield time, msg
+    for msg in player.all_notes_off():
+        yield time, msg
+
+def write_midi(path: str, timed_messages: Iterable[tuple[float, mido.Message]], ticks_per_beat: int = 480, tempo: int = 500000):
+    """Write `(time, message)` pairs with absolute times in seconds to a single-track MIDI file."""
+    track = mido.MidiTrack()
+    track.append(mido.MetaMessage('set_tempo', tempo=tempo, time=0))
+    last_tick = 0
+    for time, msg in timed_messages:
+        tick = round(mido.second2tick(time, ticks_per_beat, tempo))
+        track.append(msg.copy(time=tick - last_tick))
+        last_tick = tick
+    mido.MidiFile(ticks_per_beat=ticks_per_beat, tracks=[track]).save(path)
+
+def write_wav(path: str, blocks: Iterable[np.ndarray], sample_rate: int):
+    """Write float sample blocks to a mono 16-bit WAV file, one block at a time."""
+    with WavWriter(path, sample_rate) as out:
+        out.write_blocks(blocks)
+
+def convert_file(input_path: str, midi_path: str | None = None, wav_path: str | None = None, channel: int = 0, sample_rate: int = 44100) -> dict:
+    """Translate one MIDI file to DTMF, writing a MIDI file, a WAV file, or both.
+    Returns a summary of the conversion: the number of chords translated, and how many distinct chord shapes
+      had to be searched (single notes are matched without a search, so are not included).
+    If `instrument` is enabled, the counters are reset for the file and published when it is done,
+      and the summary includes them under 'counters'.
+    """
+    if instrument.enabled:
+        instrument.reset()
+    cache = BestPairCache()
+    chords = 0
+    def matcher(main: Tone, extras: list[Tone]) -> tuple[object, tuple[Tone, Tone]]:
+        nonlocal chords
+        chords += 1
+        return cache(main, extras)
+    timed_pairs = translate_tone_sets(timed_tone_sets(mido.MidiFile(input_path), ToneReader(channel=channel)), matcher)
+    if midi_path is not None and wav_path is not None:
+        timed_pairs = list(timed_pairs) # both outputs need the same pairs
+
+    if midi_path is not None:
+        write_midi(midi_path, MidiOutputOptimizer().filter_timed(pairs_to_messages(timed_pairs)))
+    if wav_path is not None:
+        renderer = ToneRenderer(sample_rate=sample_rate)
+        write_wav(wav_path, renderer.render((time, list(pair or ())) for time, pair in timed_pairs), sample_rate)
+
+    info = cache.cache_info()
+    summary = {
+        'input': input_path,
+        'chords': chords,
+        'distinct_chords': info.misses,
+    }
+    if instrument.enabled:
+        summary['counters'] = instrument.publish(input=input_path)
+    return summary
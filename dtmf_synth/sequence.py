@@ -0,0 +1,141 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from .tone import Tone, ToneArray
+from .translator import K, ChordTable, as_chord_table, dtmf_all_table, pair_tone_weights
+from .util import lazy_import
+
+np = lazy_import("numpy")
+
+__all__ = ["chord_costs", "viterbi", "translate_sequence", "StreamingSequenceTranslator"]
+
+# Rather than choosing each chord's pair independently as `best_pair` does,
+#   pick the whole sequence of pairs at once, trading each chord's `loss`
+#   against the cost of switching keys or bulk tune between consecutive chords.
+
+Chord = tuple[Tone, "list[Tone] | ToneArray"]
+
+def chord_costs(chords: Sequence[Chord], table: ChordTable[K]) -> tuple[np.ndarray, np.ndarray]:
+    """The emission cost and bulk tune of every candidate for every chord, each of shape (chord, candidate).
+    A chord's cost for a candidate is the lowest `loss` over its (main, extra) targets,
+      and the tune is `best_bulk_tune` for that target.
+    A chord without extras costs the squared distance from its main note to the candidate's first tone,
+      tuned so that tone plays the main note, as `best_pair` does.
+    """
+    width = max(1, max(len(extras) for _, extras in chords))
+    targets = np.zeros((len(chords), width, 2))
+    valid = np.zeros((len(chords), width), dtype=bool)
+    for i, (main, extras) in enumerate(chords):
+        notes = extras.notes if isinstance(extras, ToneArray) else [extra.note for extra in extras]
+        targets[i, :, 0] = main.note
+        targets[i, :len(notes), 1] = notes
+        valid[i, :len(notes)] = True
+
+    flat = targets.reshape(-1, 2)
+    losses = table.losses(flat, pair_tone_weights).reshape(len(chords), width, len(table))
+    tunes = table.bulk_tunes(flat, pair_tone_weights).reshape(len(chords), width, len(table))
+    losses[~valid] = np.inf
+    best_extra = np.argmin(losses, axis=1)[:, None, :]
+    costs, tunes = np.take_along_axis(losses, best_extra, 1)[:, 0], np.take_along_axis(tunes, best_extra, 1)[:, 0]
+
+    single = ~valid.any(axis=1)
+    if single.any():
+        offsets = table.notes[None, :, 0] - targets[single, 0, :1]
+        costs[single] = offsets ** 2
+        tunes[single] = offsets
+    return costs, tunes
+
+def viterbi(costs: np.ndarray, tunes: np.ndarray, key_change_cost: float, tune_change_cost: float, initial: tuple[int, float] | None = None) -> np.ndarray:
+    """The candidate index for each chord minimizing the total emission and transition cost, shape (chord,).
+    A transition costs `key_change_cost` if the candidate changes, plus `tune_change_cost` times the squared change in bulk tune.
+    `initial` is the `(candidate, tune)` chosen before the first chord, if any.
+    """
+    n, c = costs.shape
+    changed = key_change_cost * (1 - np.eye(c))
+    backpointers = np.empty((n, c), dtype=np.intp)
+
+    total = costs[0].copy()
+    if initial is not None:
+        state, tune = initial
+        total += key_change_cost * (np.arange(c) != state) + tune_change_cost * (tunes[0] - tune) ** 2
+    states = np.arange(c)
+    for t in range(1, n):
+        if not tune_change_cost:
+            # each state is best reached either from itself or from the best state overall
+            best = np.argmin(total)
+            stay = total <= total[best] + key_change_cost
+            backpointers[t] = np.where(stay, states, best)
+            total = np.where(stay, total, total[best] + key_change_cost) + costs[t]
+            continue
+        # (previous, current) cost of every transition, plus the best cost of reaching the previous state
+        step = total[:, None] + changed + tune_change_cost * (tunes[t][None, :] - tunes[t - 1][:, None]) ** 2
+        backpointers[t] = np.argmin(step, axis=0)
+        total = step[backpointers[t], states] + costs[t]
+
+    path = np.empty(n, dtype=np.intp)
+    path[-1] = np.argmin(total)
+    for t in range(n - 1, 0, -1):
+        path[t - 1] = backpointers[t, path[t]]
+    return path
+
+def tuned_pairs(path: np.ndarray, tunes: np.ndarray, table: ChordTable[K]) -> list[tuple[K, tuple[Tone, Tone]]]:
+    notes = table.notes[path] - tunes[np.arange(len(path)), path][:, None]
+    keys = table.keys
+    return [(keys[candidate], tuple(Tone(note=note) for note in chord)) for candidate, chord in zip(path.tolist(), notes.tolist())]
+
+def translate_sequence(chords: Sequence[Chord], pairs: dict[K, tuple[Tone, Tone]] | ChordTable[K] = dtmf_all_table, key_change_cost: float = 10.0, tune_change_cost: float = 0.0) -> list[tuple[K, tuple[Tone, Tone]]]:
+    """Translate a whole sequence of `(main, extras)` chords at once, returning a `best_pair`-style result for each.
+    With both transition costs zero, each chord gets the candidate with the lowest `loss` on its own.
+    Costs are in the units of `loss`, squared semitones. The default key change cost holds a key through small losses,
+      giving fewer key changes and pitchwheel messages than independent `best_pair` calls.
+    Each candidate's tune is fixed by the chord, so a nonzero `tune_change_cost` only smooths the tune
+      by switching to keys with a similar tune, which adds key changes.
+    """
+    if not chords:
+        return []
+    table = as_chord_table(pairs)
+    costs, tunes = chord_costs(chords, table)
+    path = viterbi(costs, tunes, key_change_cost, tune_change_cost)
+    return tuned_pairs(path, tunes, table)
+
+@dataclass
+class StreamingSequenceTranslator:
+    """A fixed-lag version of `translate_sequence` for streaming use.
+    Each chord's pair is decided once `lookahead` later chords have been seen, by running `viterbi` over the pending window
+      starting from the previously decided pair, so memory is bounded by the window.
+    """
+    pairs: dict[K, tuple[Tone, Tone]] | ChordTable[K] = dtmf_all_table
+    key_change_cost: float = 10.0
+    tune_change_cost: float = 0.0
+    lookahead: int = 8
+
+    pending_costs: list[np.ndarray] = field(default_factory=list)
+    pending_tunes: list[np.ndarray] = field(default_factory=list)
+    previous: tuple[int, float] | None = None
+    """The `(candidate, tune)` of the last decided chord."""
+
+    def __post_init__(self):
+        self.table = as_chord_table(self.pairs)
+
+    def decide(self, count: int) -> list[tuple[K, tuple[Tone, Tone]]]:
+        costs, tunes = np.array(self.pending_costs), np.array(self.pending_tunes)
+        path = viterbi(costs, tunes, self.key_change_cost, self.tune_change_cost, self.previous)[:count]
+        del self.pending_costs[:count], self.pending_tunes[:count]
+        self.previous = int(path[-1]), float(tunes[count - 1, path[-1]])
+        return tuned_pairs(path, tunes[:count], self.table)
+
+    def push(self, main: Tone, extras: list[Tone] | ToneArray) -> list[tuple[K, tuple[Tone, Tone]]]:
+        """Add the next chord, returning the result for the chord `lookahead` places earlier, if it is now decided."""
+        costs, tunes = chord_costs([(main, extras)], self.table)
+        self.pending_costs.append(costs[0])
+        self.pending_tunes.append(tunes[0])
+        if len(self.pending_costs) > self.lookahead:
+            return self.decide(1)
+        return []
+
+    def flush(self) -> list[tuple[K, tuple[Tone, Tone]]]:
+        """Decide all remaining chords, at the end of the stream."""
+        if not self.pending_costs:
+            return []
+        return self.decide(len(self.pending_costs))
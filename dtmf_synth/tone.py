@@ -3,12 +3,18 @@ import dataclasses
 from dataclasses import dataclass, field
 from typing import Any
 from operator import attrgetter
+from functools import cached_property
 import math
 import numbers
 
-__all__ = ["Tuning", "Tone"]
+from . import instrument
+from .util import lazy_import
 
-@dataclass
+np = lazy_import("numpy")
+
+__all__ = ["Tuning", "Tone", "ToneArray"]
+
+@dataclass(frozen=True)
 class Tuning:
     ref_freq: float = 440.0
     ref_note: int | float = 69 # A
@@ -21,7 +27,15 @@ class Tuning:
 
     def note_for_freq(self, freq: int | float) -> float:
         return self.octave_count * math.log(freq / self.ref_freq, self.octave_factor) + self.ref_note
-    
+
+    def freqs_for_notes(self, notes: np.ndarray) -> np.ndarray:
+        """Array version of `freq_for_note`."""
+        return self.ref_freq * np.power(self.octave_factor, (np.asarray(notes, dtype=float) - self.ref_note) / self.octave_count)
+
+    def notes_for_freqs(self, freqs: np.ndarray) -> np.ndarray:
+        """Array version of `note_for_freq`."""
+        return self.octave_count * np.log(np.asarray(freqs, dtype=float) / self.ref_freq) / math.log(self.octave_factor) + self.ref_note
+
 TUNING_12ET_A440 = Tuning()
 
 class FreqConversionDescriptor:
@@ -38,6 +52,8 @@ class FreqConversionDescriptor:
             note = getattr(obj, self._note_name) # type: float
             tuning = getattr(obj, self._tuning_name, TUNING_12ET_A440) # type: Tuning
             freq = tuning.freq_for_note(note)
+            if instrument.enabled:
+                instrument.count('tone.freq_for_note')
         return freq
 
     def __set__(self, obj, value: float):
@@ -59,6 +75,8 @@ class NoteConversionDescriptor:
             freq = getattr(obj, self._freq_name) # type: float
             tuning = getattr(obj, self._tuning_name, TUNING_12ET_A440) # type: Tuning
             note = tuning.note_for_freq(freq)
+            if instrument.enabled:
+                instrument.count('tone.note_for_freq')
         return note
 
     def __set__(self, obj, value: float):
@@ -126,4 +144,92 @@ class Tone:
 
 
 
-    
\ No newline at end of file
+    
+
+
+@dataclass(frozen=True, eq=False)
+class ToneArray:
+    """A struct-of-arrays collection of tones sharing one `Tuning`.
+    Supports the interval arithmetic of `Tone` elementwise, with intervals given as scalars or arrays.
+    """
+    notes: np.ndarray
+    velocities: np.ndarray | None = None
+    tuning: Tuning = TUNING_12ET_A440
+
+    __array_ufunc__ = None # make numpy defer to our reflected operators
+
+    def __post_init__(self):
+        object.__setattr__(self, 'notes', np.asarray(self.notes, dtype=float))
+        if self.velocities is None:
+            object.__setattr__(self, 'velocities', np.full(self.notes.shape, 64, dtype=np.uint8))
+        else:
+            object.__setattr__(self, 'velocities', np.asarray(self.velocities, dtype=np.uint8))
+
+    @classmethod
+    def from_freqs(cls, freqs: np.ndarray, velocities: np.ndarray | None = None, tuning: Tuning = TUNING_12ET_A440) -> ToneArray:
+        return cls(tuning.notes_for_freqs(freqs), velocities, tuning)
+
+    @classmethod
+    def from_tones(cls, tones: list[Tone], tuning: Tuning = TUNING_12ET_A440) -> ToneArray:
+        """Collect tones into an array. Only the velocity is kept from each tone's meta."""
+        notes = [tone.note if tone.tuning == tuning else tuning.note_for_freq(tone.freq) for tone in tones]
+        velocities = [tone.meta.get('velocity', 64) for tone in tones]
+        return cls(np.array(notes, dtype=float), np.array(velocities, dtype=np.uint8), tuning)
+
+    def to_tones(self) -> list[Tone]:
+        return [self[i] for i in range(len(self))]
+
+    @cached_property
+    def freqs(self) -> np.ndarray:
+        return self.tuning.freqs_for_notes(self.notes)
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def __getitem__(self, index) -> Tone | ToneArray:
+        if isinstance(index, numbers.Integral):
+            return Tone(note=float(self.notes[index]), tuning=self.tuning, meta={'velocity': int(self.velocities[index])})
+        return ToneArray(self.notes[index], self.velocities[index], self.tuning)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(notes={self.notes!r}, velocities={self.velocities!r})"
+
+    def _operand(self, other) -> np.ndarray | None:
+        if isinstance(other, (numbers.Real, np.ndarray)):
+            return np.asarray(other, dtype=float)
+        return None
+
+    def __add__(self, other: numbers.Real | np.ndarray) -> ToneArray:
+        interval = self._operand(other)
+        if interval is None: return NotImplemented
+        return ToneArray(self.notes + interval, self.velocities, self.tuning)
+    __radd__ = __add__
+
+    def __sub__(self, other: ToneArray | Tone | numbers.Real | np.ndarray) -> np.ndarray | ToneArray:
+        if isinstance(other, ToneArray): # tones minus tones are intervals
+            if self.tuning != other.tuning: return NotImplemented
+            return self.notes - other.notes
+        if isinstance(other, Tone):
+            if self.tuning != other.tuning: return NotImplemented
+            return self.notes - other.note
+        interval = self._operand(other)
+        if interval is None: return NotImplemented
+        return ToneArray(self.notes - interval, self.velocities, self.tuning)
+
+    def __mul__(self, other: numbers.Real | np.ndarray) -> ToneArray:
+        ratio = self._operand(other)
+        if ratio is None: return NotImplemented
+        interval = self.tuning.notes_for_freqs(ratio * self.tuning.ref_freq) - self.tuning.ref_note
+        return ToneArray(self.notes + interval, self.velocities, self.tuning)
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: ToneArray | numbers.Real | np.ndarray) -> np.ndarray | ToneArray:
+        if isinstance(other, ToneArray): # tones / tones are tuning ratios
+            return self.freqs / other.freqs
+        ratio = self._operand(other)
+        if ratio is None: return NotImplemented
+        return self * (1 / ratio)
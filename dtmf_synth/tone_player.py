@@ -1,12 +1,17 @@
 
 from __future__ import annotations
-import mido
 import math
+import itertools
+from collections import OrderedDict
 from dataclasses import dataclass
+from typing import Hashable, Sequence
 
-from .util import remap
+from .util import remap, lazy_import
 from .tone import Tone
 from .midi_constants import *
+from . import instrument
+
+mido = lazy_import("mido")
 
 @dataclass
 class TonePlayer:
@@ -34,7 +39,7 @@ class TonePlayer:
             hi, lo = self.split_hi_lo(param_value)
 
         assert 0 <= hi <= 127
-        assert 0 <= lo <= 127 or lo is None
+        assert lo is None or 0 <= lo <= 127
 
         yield mido.Message('control_change', channel=self.channel, control=CTRL_DATA_ENTRY_HI, value=hi) # 0x06 = control for 'Data Entry (Coarse)'
         if lo is not None:
@@ -52,7 +57,7 @@ class TonePlayer:
         yield from self.set_rpn(RPN_PITCHBEND_RANGE, (coarse, fine))
 
     def set_tuning(self, semitones: float):
-        value = math.floor(remap(0, 1, 0x100000, 0x200000, semitones))
+        value = math.floor(remap(0, 1, 0x100000, 0x104000, semitones))
         coarse = value >> 14
         fine_hi = (value >> 7) & 0x7f
         fine_lo = value & 0x7f
@@ -66,9 +71,10 @@ class TonePlayer:
         assert abs(semitones) <= self.current_pitchbend_range
         param = math.floor(remap(-self.current_pitchbend_range, self.current_pitchbend_range, -0x2000, 0x1fff, semitones))
         if not param == self.current_pitchbend:
-            self.current_pitchbend = semitones
+            self.current_pitchbend = param
             yield mido.Message('pitchwheel', channel=self.channel, pitch=param)
 
+    @instrument.timed_generator('player.note_on', message_bytes=True)
     def note_on(self, tone: Tone):
         assert self.current_coarse is None
         semitones = tone.note
@@ -81,6 +87,7 @@ class TonePlayer:
         if 'polytouch' in tone.meta:
             yield mido.Message('polytouch', channel=self.channel, note=coarse, value=tone.meta['polytouch'])
     
+    @instrument.timed_generator('player.note_off', message_bytes=True)
     def note_off(self):
         if self.current_coarse is not None:
             yield mido.Message('note_off', channel=self.channel, note=self.current_coarse)
@@ -90,3 +97,95 @@ class TonePlayer:
         yield from self.note_off()
         yield from self.set_pitchbend(0)
         yield from self.set_pitchbend_range(2)
+
+@dataclass
+class MultiTonePlayer:
+    """Plays any number of overlapping tones by giving each its own channel from a pool, MPE-style,
+      so every tone gets its own pitchbend.
+    A new tone goes to a free channel whose pitchbend already matches it if there is one (saving a pitchwheel message),
+      else to the channel that has been free the longest, else it steals the channel of the oldest sounding tone.
+    Allocation and release take constant time.
+    """
+    channels: Sequence[int] = tuple(range(1, 16))
+    """The channel pool; by default the member channels of an MPE lower zone, leaving channel 0 as its manager channel."""
+    pitchbend_range: float = 2.0
+
+    steals: int = 0
+    """Number of tones cut off to make room for a new one."""
+    bend_matches: int = 0
+    """Number of tones placed on a free channel whose pitchbend already matched."""
+
+    def __post_init__(self):
+        self.players = [TonePlayer(channel=channel, current_pitchbend_range=self.pitchbend_range) for channel in self.channels]
+        self.free: OrderedDict[int, None] = OrderedDict.fromkeys(range(len(self.players)))
+        """Indices of the free players, longest free first."""
+        self.free_by_bend: dict[int, OrderedDict[int, None]] = {0: OrderedDict.fromkeys(range(len(self.players)))}
+        """The same indices grouped by their channel's current pitchwheel value."""
+        self.voices: OrderedDict[Hashable, int] = OrderedDict()
+        """The player index of each sounding tone, by key, oldest first."""
+        self.keys = itertools.count()
+
+    def pitchwheel(self, semitones: float) -> int:
+        """The pitchwheel value that plays a tone `semitones` above or below its coarse note, as `TonePlayer.set_pitchbend` computes it."""
+        return math.floor(remap(-self.pitchbend_range, self.pitchbend_range, -0x2000, 0x1fff, semitones))
+
+    def take_free(self, index: int):
+        del self.free[index]
+        bend = self.players[index].current_pitchbend
+        same_bend = self.free_by_bend[bend]
+        del same_bend[index]
+        if not same_bend:
+            del self.free_by_bend[bend]
+
+    def put_free(self, index: int):
+        self.free[index] = None
+        self.free_by_bend.setdefault(self.players[index].current_pitchbend, OrderedDict())[index] = None
+
+    def allocate(self, tone: Tone):
+        """Pick a player for a new tone, yielding the messages that release it first if it has to be stolen."""
+        semitones = tone.note
+        same_bend = self.free_by_bend.get(self.pitchwheel(semitones - round(semitones)))
+        if same_bend:
+            index = next(iter(same_bend))
+            self.bend_matches += 1
+        elif self.free:
+            index = next(iter(self.free))
+        else:
+            _, index = self.voices.popitem(last=False)
+            self.steals += 1
+            yield from self.players[index].note_off()
+            self.put_free(index)
+        self.take_free(index)
+        return index
+
+    def note_on(self, tone: Tone, key: Hashable = None):
+        """Start a tone under `key`, which `note_off` takes to release it; by default, a new integer.
+        Returns the key as the generator's return value, e.g. `key = yield from player.note_on(tone)`.
+        """
+        if key is None:
+            key = next(self.keys)
+        if key in self.voices:
+            yield from self.note_off(key)
+        index = yield from self.allocate(tone)
+        self.voices[key] = index
+        yield from self.players[index].note_on(tone)
+        return key
+
+    def note_off(self, key: Hashable):
+        """Release the tone started under `key`, if it is still sounding."""
+        index = self.voices.pop(key, None)
+        if index is not None:
+            yield from self.players[index].note_off()
+            self.put_free(index)
+
+    def all_notes_off(self):
+        for key in list(self.voices):
+            yield from self.note_off(key)
+
+    def reset(self):
+        yield from self.all_notes_off()
+        for index, player in enumerate(self.players):
+            self.take_free(index)
+            yield from player.set_pitchbend(0)
+            yield from player.set_pitchbend_range(self.pitchbend_range)
+            self.put_free(index)
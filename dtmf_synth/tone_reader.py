@@ -1,13 +1,16 @@
 
 from __future__ import annotations
-import mido
 import math
 from dataclasses import dataclass, field
-from typing import Iterable, Generator
+from typing import Iterable, Generator, NamedTuple
 
-from .util import remap
-from .tone import Tone
+from .util import remap, lazy_import
+from .tone import Tone, ToneArray
 from .midi_constants import *
+from . import instrument
+
+np = lazy_import("numpy")
+mido = lazy_import("mido")
 
 @dataclass
 class ToneReader:
@@ -51,10 +54,14 @@ class ToneReader:
         """The combined tuning and pitchbend adjustment."""
         return self.pitchbend + self.tuning
 
-    notes_playing: list[int] = field(default_factory=list) # TODO implement correct multi note_on logic
+    notes_playing: list[int] = field(default_factory=list)
     notes_meta: dict[int, dict] = field(default_factory=dict)
     def current_tones(self) -> list[Tone]:
         return [Tone(note=note + self.note_adjustment, meta=self.notes_meta[note]) for note in self.notes_playing]
+
+    def current_tone_array(self) -> ToneArray:
+        velocities = [self.notes_meta[note].get('velocity', 64) for note in self.notes_playing]
+        return ToneArray(np.array(self.notes_playing, dtype=float) + self.note_adjustment, velocities)
     
 
     def split_hi_lo(self, word: int) -> tuple[int,int]:
@@ -67,21 +74,48 @@ class ToneReader:
         assert 0 <= lo <= 0x7f
         return hi << 7 | lo
 
-    def messages_to_tones(self, messages: Iterable[mido.Message]) -> Generator[list[Tone], None, None]:
-        last_tones = None
-        
-        for msg in messages:
-            if msg.type == 'note_on' and msg.channel == self.channel:
-                self.notes_playing.append(msg.note)
-                self.notes_meta[msg.note]['velocity'] = msg.velocity
-            elif msg.type == 'note_off' and msg.channel == self.channel:
+    def apply_message(self, msg: mido.Message) -> Generator[tuple[str, int | None], None, None]:
+        """Update the reader state for one message, yielding `(kind, note)` for each resulting change.
+        `kind` is one of the `ToneChange` kinds; `note` is None for `ADJUSTED`."""
+        if instrument.enabled:
+            instrument.count('reader.messages')
+        if msg.type == 'reset':
+            for note in self.notes_playing:
+                yield REMOVED, note
+            old_adjustment = self.note_adjustment
+            self.rpn_addr_hi = 0x7f
+            self.rpn_addr_lo = 0x7f
+            self.pitchwheel = 0
+            self.notes_playing.clear()
+            self.notes_meta.clear()
+            if self.note_adjustment != old_adjustment:
+                yield ADJUSTED, None
+            return
+        if getattr(msg, 'channel', None) != self.channel:
+            return
+
+        if msg.type == 'note_on' and msg.velocity > 0:
+            if msg.note in self.notes_playing: # a retriggered note restarts rather than being held twice
+                yield REMOVED, msg.note
+                self.notes_playing.remove(msg.note)
+            self.notes_playing.append(msg.note)
+            self.notes_meta[msg.note] = {'velocity': msg.velocity}
+            yield ADDED, msg.note
+        elif msg.type in ('note_off', 'note_on'): # note_on with velocity 0 is a note_off
+            if msg.note in self.notes_playing:
                 self.notes_meta[msg.note]['velocity'] = msg.velocity
                 self.notes_playing.remove(msg.note)
-            elif msg.type == 'polytouch' and msg.channel == self.channel:
+                yield REMOVED, msg.note
+        elif msg.type == 'polytouch':
+            if msg.note in self.notes_meta:
                 self.notes_meta[msg.note]['polytouch'] = msg.value
-            elif msg.type == 'pitchwheel' and msg.channel == self.channel:
+                if msg.note in self.notes_playing:
+                    yield TOUCHED, msg.note
+        else:
+            old_adjustment = self.note_adjustment
+            if msg.type == 'pitchwheel':
                 self.pitchwheel = remap(-8192, 8191, -1, 1, msg.pitch)
-            elif msg.type == 'control_change' and msg.channel == self.channel:
+            elif msg.type == 'control_change':
                 if msg.control == CTRL_RPN_ADDR_HI:
                     self.rpn_addr_hi = msg.value
                 elif msg.control == CTRL_RPN_ADDR_LO:
@@ -98,16 +132,196 @@ class ToneReader:
                         self.pitchbend_range_fine = msg.value
                     elif self.rpn_addr == RPN_FINE_TUNING:
                         self.tuning_fine_lo = msg.value
-            elif msg.type == 'reset':
-                self.rpn_addr_hi = 0x7f
-                self.rpn_addr_lo = 0x7f
-                self.pitchwheel = 0
-                self.notes_playing.clear()
-                self.notes_meta.clear()
+            if self.note_adjustment != old_adjustment:
+                yield ADJUSTED, None
+
+    @instrument.timed_generator('reader.messages_to_tones')
+    def messages_to_tones(self, messages: Iterable[mido.Message]) -> Generator[list[Tone], None, None]:
+        last_tones = None
+        
+        for msg in messages:
+            for _ in self.apply_message(msg):
+                pass
             
             tones = self.current_tones()
             if tones != last_tones:
                 last_tones = tones
+                if instrument.enabled:
+                    instrument.count('reader.tone_sets')
                 yield tones
 
-            
\ No newline at end of file
+    @instrument.timed_generator('reader.messages_to_changes')
+    def messages_to_changes(self, messages: Iterable[mido.Message], start_time: float = 0) -> Generator[ToneChange, None, None]:
+        """Streaming alternative to `messages_to_tones` that yields one `ToneChange` per change instead of the whole tone set.
+        Timestamps are absolute, accumulated from each message's `time` starting at `start_time`,
+          so they are in seconds when iterating a `mido.MidiFile` and in ticks when iterating a `mido.MidiTrack`.
+        """
+        time = start_time
+        for msg in messages:
+            time += msg.time
+            for kind, note in self.apply_message(msg):
+                meta = dict(self.notes_meta[note]) if note is not None else None # a snapshot, as notes_meta is updated in place
+                yield ToneChange(time, kind, note, self.note_adjustment, meta)
+
+ADDED = 'added'
+REMOVED = 'removed'
+TOUCHED = 'touched'
+ADJUSTED = 'adjusted'
+
+class ToneChange(NamedTuple):
+    """A single change to the set of tones held by a `ToneReader`."""
+    time: float
+    kind: str
+    """`ADDED` or `REMOVED` for a note starting or stopping, `TOUCHED` for a polytouch change, `ADJUSTED` for a tuning or pitchbend change affecting all notes."""
+    note: int | None
+    """The MIDI note, for changes to a single note."""
+    adjustment: float
+    """The reader's note adjustment after the change."""
+    meta: dict | None = None
+    """The note's meta as of the change."""
+    channel: int | None = None
+    """The MIDI channel, for changes from a `MultiToneReader`."""
+
+    @property
+    def tone(self) -> Tone | None:
+        """The affected tone, for changes to a single note."""
+        if self.note is None:
+            return None
+        return Tone(note=self.note + self.adjustment, meta=self.meta)
+
+
+@dataclass
+class MultiToneReader:
+    """Interprets every MIDI channel in a single pass over the messages.
+    Equivalent to one `ToneReader` per channel, with the per-channel state held in fixed-size arrays indexed by channel (and note).
+    """
+    channels: int = 16
+
+    def __post_init__(self):
+        n = self.channels
+        self.pitchwheel = np.zeros(n)
+        self.rpn_addr_hi = np.full(n, 0x7f, dtype=np.uint8)
+        self.rpn_addr_lo = np.full(n, 0x7f, dtype=np.uint8)
+        self.pitchbend_range_coarse = np.full(n, 0x02, dtype=np.uint8)
+        self.pitchbend_range_fine = np.zeros(n, dtype=np.uint8)
+        self.tuning_coarse = np.full(n, 0x40, dtype=np.uint8)
+        self.tuning_fine_hi = np.zeros(n, dtype=np.uint8)
+        self.tuning_fine_lo = np.zeros(n, dtype=np.uint8)
+        self.note_adjustment = np.zeros(n) # combined tuning and pitchbend adjustment, kept up to date by update_adjustment
+
+        self.playing = np.zeros((n, 128), dtype=bool)
+        self.velocity = np.zeros((n, 128), dtype=np.uint8)
+        self.polytouch = np.full((n, 128), -1, dtype=np.int8)
+        self.on_order = np.zeros((n, 128), dtype=np.int64) # so held notes can be listed in the order they started
+        self.on_count = 0
+
+    def rpn_addr(self, channel: int) -> int:
+        return int(self.rpn_addr_hi[channel]) << 7 | int(self.rpn_addr_lo[channel])
+
+    def update_adjustment(self, channel: int) -> bool:
+        """Recompute a channel's note adjustment, returning whether it changed."""
+        pitchbend_range = int(self.pitchbend_range_coarse[channel]) + int(self.pitchbend_range_fine[channel]) / 100
+        tuning_word = int(self.tuning_coarse[channel]) << 14 | int(self.tuning_fine_hi[channel]) << 7 | int(self.tuning_fine_lo[channel])
+        adjustment = pitchbend_range * float(self.pitchwheel[channel]) + remap(0x100000, 0x104000, 0, 1, tuning_word)
+        if adjustment == self.note_adjustment[channel]:
+            return False
+        self.note_adjustment[channel] = adjustment
+        return True
+
+    def note_meta(self, channel: int, note: int) -> dict:
+        meta = {'velocity': int(self.velocity[channel, note])}
+        if self.polytouch[channel, note] >= 0:
+            meta['polytouch'] = int(self.polytouch[channel, note])
+        return meta
+
+    def held_notes(self, channel: int) -> np.ndarray:
+        """The channel's held notes, in the order they started."""
+        notes = np.flatnonzero(self.playing[channel])
+        return notes[np.argsort(self.on_order[channel, notes])]
+
+    def current_tones(self, channel: int) -> list[Tone]:
+        notes = self.held_notes(channel)
+        adjustment = float(self.note_adjustment[channel])
+        return [Tone(note=int(note) + adjustment, meta=self.note_meta(channel, note)) for note in notes]
+
+    def current_tone_array(self, channel: int) -> ToneArray:
+        notes = self.held_notes(channel)
+        return ToneArray(notes + self.note_adjustment[channel], self.velocity[channel, notes])
+
+    def apply_message(self, msg: mido.Message) -> Generator[tuple[int, str, int | None], None, None]:
+        """Update the state of the message's channel, yielding `(channel, kind, note)` for each resulting change."""
+        if instrument.enabled:
+            instrument.count('multi_reader.messages')
+        if msg.type == 'reset':
+            for channel in range(self.channels):
+                for note in self.held_notes(channel).tolist():
+                    yield channel, REMOVED, note
+            self.playing[:] = False
+            self.polytouch[:] = -1
+            self.rpn_addr_hi[:] = 0x7f
+            self.rpn_addr_lo[:] = 0x7f
+            self.pitchwheel[:] = 0
+            for channel in range(self.channels):
+                if self.update_adjustment(channel):
+                    yield channel, ADJUSTED, None
+            return
+
+        channel = getattr(msg, 'channel', None)
+        if channel is None or channel >= self.channels:
+            return
+
+        if msg.type == 'note_on' and msg.velocity > 0:
+            if self.playing[channel, msg.note]:
+                yield channel, REMOVED, msg.note
+            self.playing[channel, msg.note] = True
+            self.velocity[channel, msg.note] = msg.velocity
+            self.polytouch[channel, msg.note] = -1
+            self.on_order[channel, msg.note] = self.on_count
+            self.on_count += 1
+            yield channel, ADDED, msg.note
+        elif msg.type in ('note_off', 'note_on'): # note_on with velocity 0 is a note_off
+            if self.playing[channel, msg.note]:
+                self.velocity[channel, msg.note] = msg.velocity
+                self.playing[channel, msg.note] = False
+                yield channel, REMOVED, msg.note
+        elif msg.type == 'polytouch':
+            if self.playing[channel, msg.note]:
+                self.polytouch[channel, msg.note] = msg.value
+                yield channel, TOUCHED, msg.note
+        elif msg.type == 'pitchwheel':
+            self.pitchwheel[channel] = remap(-8192, 8191, -1, 1, msg.pitch)
+            if self.update_adjustment(channel):
+                yield channel, ADJUSTED, None
+        elif msg.type == 'control_change':
+            if msg.control == CTRL_RPN_ADDR_HI:
+                self.rpn_addr_hi[channel] = msg.value
+            elif msg.control == CTRL_RPN_ADDR_LO:
+                self.rpn_addr_lo[channel] = msg.value
+            elif msg.control == CTRL_DATA_ENTRY_HI:
+                rpn_addr = self.rpn_addr(channel)
+                if rpn_addr == RPN_PITCHBEND_RANGE:
+                    self.pitchbend_range_coarse[channel] = msg.value
+                elif rpn_addr == RPN_COARSE_TUNING:
+                    self.tuning_coarse[channel] = msg.value
+                elif rpn_addr == RPN_FINE_TUNING:
+                    self.tuning_fine_hi[channel] = msg.value
+                if self.update_adjustment(channel):
+                    yield channel, ADJUSTED, None
+            elif msg.control == CTRL_DATA_ENTRY_LO:
+                rpn_addr = self.rpn_addr(channel)
+                if rpn_addr == RPN_PITCHBEND_RANGE:
+                    self.pitchbend_range_fine[channel] = msg.value
+                elif rpn_addr == RPN_FINE_TUNING:
+                    self.tuning_fine_lo[channel] = msg.value
+                if self.update_adjustment(channel):
+                    yield channel, ADJUSTED, None
+
+    @instrument.timed_generator('multi_reader.messages_to_changes')
+    def messages_to_changes(self, messages: Iterable[mido.Message], start_time: float = 0) -> Generator[ToneChange, None, None]:
+        """Like `ToneReader.messages_to_changes`, for all channels at once; each change is tagged with its channel."""
+        time = start_time
+        for msg in messages:
+            time += msg.time
+            for channel, kind, note in self.apply_message(msg):
+                meta = self.note_meta(channel, note) if note is not None else None
+                yield ToneChange(time, kind, note, float(self.note_adjustment[channel]), meta, channel)
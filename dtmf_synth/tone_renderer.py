@@ -0,0 +1,131 @@
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Iterable, Generator
+
+from .tone import Tone
+from . import instrument
+from .util import lazy_import
+
+np = lazy_import("numpy")
+
+@dataclass
+class ToneRenderer:
+    """Renders a timed stream of tone sets as PCM audio, one fixed-size block at a time.
+    Each tone keeps the voice that played the same frequency in the previous tone set.
+    The remaining tones take over the remaining voices in order if there are as many of each, so a tone set whose pitch
+      is bent as a whole keeps its phase; otherwise they start on silent voices, and the remaining voices fade out.
+    Every change in a voice's gain, including its start and end, is a linear ramp of `ramp_time` seconds.
+    """
+    sample_rate: int = 44100
+    block_size: int = 1024
+    ramp_time: float = 0.005
+    """Duration of the gain ramp applied on note on, note off, and velocity changes, in seconds."""
+    amplitude: float = 0.25
+    """Peak amplitude of a single voice at velocity 127."""
+    dtype: np.dtype | str = "float32"
+
+    phases: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    """Oscillator phase of each voice, in radians."""
+    freqs: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    gains: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    target_gains: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    steps: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    """Gain change per sample of each voice's current ramp."""
+    held: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=bool))
+    """Whether each voice is playing a tone of the current tone set."""
+
+    sample_count: int = 0
+    """Number of samples rendered so far."""
+
+    def add_voice(self) -> int:
+        self.phases = np.append(self.phases, 0.0)
+        self.freqs = np.append(self.freqs, 0.0)
+        self.gains = np.append(self.gains, 0.0)
+        self.target_gains = np.append(self.target_gains, 0.0)
+        self.steps = np.append(self.steps, 0.0)
+        self.held = np.append(self.held, False)
+        return len(self.held) - 1
+
+    def retarget(self, voice: int, gain: float):
+        """Start a ramp from the voice's current gain to `gain`, lasting `ramp_time`."""
+        if gain != self.target_gains[voice]:
+            self.target_gains[voice] = gain
+            self.steps[voice] = abs(gain - self.gains[voice]) / max(self.ramp_time * self.sample_rate, 1)
+
+    def set_tones(self, tones: list[Tone]):
+        """Retarget the voices to a new tone set, starting at the current sample."""
+        freqs = [tone.freq for tone in tones]
+        by_freq: dict[float, list[int]] = {}
+        for voice in np.flatnonzero(self.held).tolist():
+            by_freq.setdefault(self.freqs[voice], []).append(voice)
+        voices = [by_freq[freq].pop(0) if by_freq.get(freq) else None for freq in freqs]
+
+        unmatched = sorted(voice for same_freq in by_freq.values() for voice in same_freq)
+        new = [i for i, voice in enumerate(voices) if voice is None]
+        if len(unmatched) == len(new): # e.g. a pitch bend: glide the voices to their new frequencies
+            for i, voice in zip(new, unmatched):
+                voices[i] = voice
+            unmatched = []
+        else:
+            free = np.flatnonzero(~self.held & (self.gains == 0) & (self.target_gains == 0)).tolist()
+            for i in new:
+                voices[i] = free.pop(0) if free else self.add_voice()
+
+        for voice in unmatched: # released voices keep their frequency while they fade out
+            self.held[voice] = False
+            self.retarget(voice, 0.0)
+        for voice, freq, tone in zip(voices, freqs, tones):
+            if self.gains[voice] == 0:
+                self.phases[voice] = 0
+            self.held[voice] = True
+            self.freqs[voice] = freq
+            self.retarget(voice, self.amplitude * tone.meta.get('velocity', 64) / 127)
+
+    def synthesize(self, count: int) -> np.ndarray:
+        """Generate the next `count` samples and advance the oscillator and envelope state."""
+        t = np.arange(1, count + 1)
+        phase = self.phases[:, None] + (2 * np.pi / self.sample_rate) * self.freqs[:, None] * t
+        delta = self.target_gains - self.gains
+        ramp = np.minimum(self.steps[:, None] * t, np.abs(delta)[:, None])
+        gain = self.gains[:, None] + np.sign(delta)[:, None] * ramp
+
+        self.phases = np.mod(phase[:, -1], 2 * np.pi) if count else self.phases
+        self.gains = gain[:, -1].copy() if count else self.gains
+        self.sample_count += count
+        return (np.sin(phase) * gain).sum(axis=0)
+
+    @property
+    def silent(self) -> bool:
+        return not np.any(self.gains) and not np.any(self.target_gains)
+
+    @instrument.timed_generator('renderer.render')
+    def render(self, timed_tones: Iterable[tuple[float, list[Tone]]]) -> Generator[np.ndarray, None, None]:
+        """Render `(time, tones)` events, where `time` is in seconds from the start of the stream and non-decreasing.
+        Each tone set sounds from its time until the next event; after the last event, voices are released.
+        Yields arrays of `block_size` samples, except for a shorter final block.
+        """
+        block = np.zeros(self.block_size, dtype=self.dtype)
+        fill = 0
+
+        def advance(count: int):
+            nonlocal block, fill
+            while count > 0:
+                n = min(count, self.block_size - fill)
+                block[fill:fill + n] = self.synthesize(n)
+                fill += n
+                count -= n
+                if fill == self.block_size:
+                    yield block
+                    block = np.zeros(self.block_size, dtype=self.dtype)
+                    fill = 0
+
+        for time, tones in timed_tones:
+            yield from advance(round(time * self.sample_rate) - self.sample_count)
+            self.set_tones(tones)
+
+        self.set_tones([])
+        while not self.silent:
+            yield from advance(self.block_size - fill)
+        if fill:
+            yield block[:fill]
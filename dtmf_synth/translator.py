@@ -1,10 +1,16 @@
 
 from __future__ import annotations
-from typing import TypeVar
-import numpy as np
+from typing import TypeVar, Generic, Sequence
+from functools import cached_property
 import itertools
+import bisect
+import random
 from .tone import *
+from . import instrument
 from .phone_chords import dtmf
+from .util import lazy_import
+
+np = lazy_import("numpy")
 # Given: a "main" input note, and "chord" input notes
 # - pick the DTMF tone pair that is optimal over a cost function that considers:
 #   - distance from the main input note to one of the pair
@@ -19,33 +25,250 @@ from .phone_chords import dtmf
 
 K = TypeVar('K')
 
-dtmf_all = dtmf.copy()
-dtmf_all.update({k + "_r": list(reversed(v)) for k,v in dtmf.items()})
+dtmf_all = dtmf | dtmf.reversed("_r")
+
+class ChordTable(Generic[K]):
+    """A dictionary of candidate chords, precomputed as arrays of notes and intervals.
+    Scores a whole set of target chords against every candidate in one broadcast,
+      giving the same results as `loss`, `best_bulk_tune` and `tuned_loss` applied pairwise.
+    The arrays are built on first use, so a table can be declared at import time for free.
+    """
+
+    def __init__(self, chords: dict[K, Sequence[Tone]]):
+        self.chords = chords
+        self.keys: list[K] = list(chords)
+
+    @cached_property
+    def notes(self) -> np.ndarray:
+        """Shape (candidate, tone)."""
+        return np.array([[tone.note for tone in self.chords[k]] for k in self.keys], dtype=float)
+
+    @cached_property
+    def intervals(self) -> np.ndarray:
+        """Shape (candidate, tone, tone)."""
+        return np.abs(self.notes[:, :, None] - self.notes[:, None, :])
+
+    @cached_property
+    def default_tone_weights(self) -> np.ndarray:
+        return np.ones(self.chord_size)
+
+    @cached_property
+    def default_interval_weights(self) -> np.ndarray:
+        return np.tri(self.chord_size, k=-1)
+
+    @cached_property
+    def first_notes(self) -> list[float]:
+        """The distinct first notes of the candidates, in ascending order, for matching a lone main note."""
+        return np.unique(self.notes[:, 0]).tolist()
+
+    @cached_property
+    def candidates_by_first(self) -> list[list[int]]:
+        """The candidates whose first note is each of `first_notes`."""
+        groups = np.searchsorted(self.first_notes, self.notes[:, 0])
+        return [np.flatnonzero(groups == i).tolist() for i in range(len(self.first_notes))]
+
+    def prepare(self) -> ChordTable[K]:
+        """Build the arrays now rather than on first use, ahead of latency-sensitive work."""
+        self.default_tone_weights, self.default_weighted_intervals, self.first_candidates
+        return self
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def chord_size(self) -> int:
+        return self.notes.shape[1]
+
+    def _weights(self, tone_weights, interval_weights) -> tuple[np.ndarray, np.ndarray]:
+        if tone_weights is None: tone_weights = self.default_tone_weights
+        if interval_weights is None: interval_weights = self.default_interval_weights
+        return np.asarray(tone_weights, dtype=float), np.asarray(interval_weights, dtype=float)
+
+    def interval_losses(self, targets: np.ndarray, interval_weights: np.ndarray = None) -> np.ndarray:
+        """The interval part of `loss` for every (target, candidate), shape (target, candidate).
+        This part is unaffected by a bulk tune."""
+        i, j, intervals, weights = self.default_weighted_intervals if interval_weights is None else self._weighted_intervals(interval_weights)
+        target_intervals = np.abs(targets[:, i] - targets[:, j])
+        return (target_intervals[:, None] - intervals) ** 2 @ weights
+
+    def _weighted_intervals(self, interval_weights: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """The tone indices, candidate intervals and weights of the intervals with nonzero weight."""
+        interval_weights = np.asarray(interval_weights, dtype=float)
+        i, j = np.nonzero(interval_weights)
+        return i, j, self.intervals[:, i, j], interval_weights[i, j]
+
+    @cached_property
+    def default_weighted_intervals(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """`_weighted_intervals` of `default_interval_weights`: one interval per pair of tones."""
+        return self._weighted_intervals(self.default_interval_weights)
+
+    def bulk_tunes(self, targets: np.ndarray, tone_weights: list[float] | np.ndarray = None) -> np.ndarray:
+        """`best_bulk_tune` for every (target, candidate), shape (target, candidate)."""
+        tone_weights, _ = self._weights(tone_weights, None)
+        return ((self.notes[None] - targets[:, None]) * tone_weights).sum(axis=-1) / tone_weights.sum()
+
+    def losses(self, targets: np.ndarray, tone_weights: list[float] | np.ndarray = None, interval_weights: np.ndarray = None, tunes: np.ndarray = None) -> np.ndarray:
+        """`loss` for every (target, candidate), shape (target, candidate).
+        If `tunes` is given, each target is first shifted by its tune, as in `tuned_loss`."""
+        return self.tone_losses(targets, tone_weights, tunes) + self.interval_losses(targets, interval_weights)
 
-def best_pair(main: Tone, extras: list[Tone], pairs: dict[K,tuple[Tone,Tone]] = dtmf_all) -> tuple[K, tuple[Tone,Tone]]:
+    def tone_losses(self, targets: np.ndarray, tone_weights: list[float] | np.ndarray = None, tunes: np.ndarray = None) -> np.ndarray:
+        """The per-tone part of `loss` for every (target, candidate), shape (target, candidate)."""
+        tone_weights, _ = self._weights(tone_weights, None)
+        shifted = targets[:, None] if tunes is None else targets[:, None] + tunes[..., None]
+        return ((shifted - self.notes[None]) ** 2 * tone_weights).sum(axis=-1)
+
+    @instrument.timed('translator.best_match')
+    def best_match(self, targets: np.ndarray, tone_weights: list[float] | np.ndarray = None, interval_weights: np.ndarray = None) -> tuple[int, int, float]:
+        """Vectorized equivalent of the selection in `best_pair`.
+        For each target chord (a row of `targets`), pick the candidate with the lowest untuned `loss`,
+          then pick the target whose candidate has the lowest `tuned_loss`.
+        Returns the index of that target, the index of its candidate in `keys`, and the bulk tune between them.
+        """
+        tone_weights, _ = self._weights(tone_weights, None)
+        targets = np.asarray(targets, dtype=float)
+        offsets = targets[:, None] - self.notes
+        untuned = offsets ** 2 @ tone_weights + self.interval_losses(targets, interval_weights)
+        candidates = np.argmin(untuned, axis=1)
+        if len(targets) == 1:
+            target = 0
+            tune = offsets[0, candidates[0]] @ tone_weights / -tone_weights.sum()
+        else:
+            rows = np.arange(len(targets))
+            total = tone_weights.sum()
+            tunes = offsets[rows, candidates] @ tone_weights / -total
+            # shifting by the bulk tune lowers the tone loss by exactly total * tune**2; the interval loss is unchanged
+            target = int(np.argmin(untuned[rows, candidates] - total * tunes ** 2))
+            tune = tunes[target]
+        return target, int(candidates[target]), float(tune)
+
+    @cached_property
+    def first_candidates(self) -> np.ndarray:
+        """The first of `candidates_by_first` for each of `first_notes`."""
+        return np.array([candidates[0] for candidates in self.candidates_by_first], dtype=np.intp)
+
+    def best_single_matches(self, notes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """`best_single_match` without `rng` for each of `notes`, returning arrays of candidates and tunes."""
+        notes = np.asarray(notes, dtype=float)
+        first = np.asarray(self.first_notes)
+        i = np.searchsorted(first, notes, side='left')
+        lower, upper = np.maximum(i - 1, 0), np.minimum(i, len(first) - 1)
+        i = np.where((i == len(first)) | ((i > 0) & (notes - first[lower] <= first[upper] - notes)), lower, upper)
+        return self.first_candidates[i], first[i] - notes
+
+    def best_single_match(self, note: float, rng: random.Random | None = None) -> tuple[int, float]:
+        """The candidate whose first tone is nearest to `note`, by binary search, and the tune that moves that tone onto `note`.
+        When several candidates share that first tone, the first is returned, or a random one drawn from `rng`.
+        """
+        i = bisect.bisect_left(self.first_notes, note)
+        if i == len(self.first_notes) or (i > 0 and note - self.first_notes[i - 1] <= self.first_notes[i] - note):
+            i -= 1
+        candidates = self.candidates_by_first[i]
+        candidate = candidates[0] if rng is None else rng.choice(candidates)
+        return candidate, self.first_notes[i] - note
+
+dtmf_all_table = ChordTable(dtmf_all)
+pair_tone_weights = (1.0, 0.5)
+
+@instrument.timed('translator.best_pair')
+def best_pair(main: Tone, extras: list[Tone] | ToneArray, pairs: dict[K,tuple[Tone,Tone]] | ChordTable[K] = dtmf_all, rng: random.Random | None = None) -> tuple[K, tuple[Tone,Tone]]:
     """Finds the best matching DTMF tonepair for a given note and chord.
     Given a principal note `main`, a list of additional chord tone `extras', and a dictionary `pairs` whose values are pairs of tones,
       this method selects the chord tone from `extras` that is easiest to approximate,
       selects the best approximation to (`main`, `extra`) among `pairs`,
       and applies a tuning adjustment to the selected pair.
+    `pairs` may also be a prebuilt `ChordTable`, to avoid rebuilding the candidate arrays on each call.
+    If `extras` is empty, the pair whose first tone is nearest to `main` is selected and tuned to play `main` exactly;
+      among equally near pairs, the first is used, or one chosen by `rng` for variety (seed it for reproducible output).
     The returned value is a tuple containing:
     - the dictionary key of the selected pair
     - the tuning-adjusted pair of notes
     """
-    if not extras:
-        # TODO return random matching DTMF
-        raise NotImplementedError("TODO: return random matching DTMF when theres's no chord tones.")
-
-    targets = [(main, extra) for extra in extras]
-    tone_weights = [1,0.5]
-    best_pair_for_target = [(target, best_match_for_chord(target, pairs, tone_weights)) for target in targets]
-    target, k = min(best_pair_for_target, key = lambda k: tuned_loss(k[0], pairs[k[1]], tone_weights))
-    
-    tune = best_bulk_tune(target, pairs[k], tone_weights)
+    table = as_chord_table(pairs)
+    main_note = main.note
+    if not len(extras):
+        i, tune = table.best_single_match(main_note, rng)
+        k = table.keys[i]
+        return k, detuned(table.chords[k], tune)
+
+    extra_notes = extras.notes if isinstance(extras, ToneArray) else [extra.note for extra in extras]
+    targets = np.empty((len(extra_notes), 2))
+    targets[:, 0] = main_note
+    targets[:, 1] = extra_notes
+    _, i, tune = table.best_match(targets, pair_tone_weights)
+    k = table.keys[i]
+    return k, detuned(table.chords[k], tune)
+
+def detuned(chord: Sequence[Tone], tune: float) -> tuple[Tone, ...]:
+    """`tuple(tone - tune for tone in chord)`, without the overhead of `dataclasses.replace`."""
+    return tuple(Tone(note=tone.note - tune, tuning=tone.tuning, meta=tone.meta) for tone in chord)
+
+def chord_arrays(chords: Sequence[tuple[Tone, list[Tone] | ToneArray]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The `(main, extras)` chords as arrays for `best_pairs`: the main notes, shape (chord,),
+      the extra notes padded with NaN, shape (chord, extra), and the mask of real extras.
+    """
+    width = max((len(extras) for _, extras in chords), default=0)
+    mains = np.array([main.note for main, _ in chords], dtype=float)
+    extras = np.full((len(chords), width), np.nan)
+    for i, (_, chord_extras) in enumerate(chords):
+        extras[i, :len(chord_extras)] = chord_extras.notes if isinstance(chord_extras, ToneArray) else [extra.note for extra in chord_extras]
+    return mains, extras, ~np.isnan(extras)
+
+def best_pairs(mains: np.ndarray, extras: np.ndarray, mask: np.ndarray | None = None, pairs: dict[K,tuple[Tone,Tone]] | ChordTable[K] = dtmf_all_table, chunk_size: int = 4096) -> tuple[np.ndarray, np.ndarray]:
+    """`best_pair` for a whole batch of chords in a few array operations, with the same results.
+    `mains` holds each chord's main note, shape (chord,), and `extras` its extra notes, shape (chord, extra), padded to the widest chord;
+      `mask` marks the real extras, and defaults to the entries that aren't NaN.
+    Returns, for each chord, the index of the selected pair in the table's keys (for the default, the keys of `dtmf_all`, in order),
+      and its tune: the pair to play is each of the pair's tones minus the tune, as `best_pair` returns.
+    Chords are scored `chunk_size` at a time, bounding the memory used to a few arrays of `chunk_size * extra * len(pairs)` losses.
+    """
+    table = as_chord_table(pairs)
+    if table.chord_size != 2:
+        raise ValueError("best_pairs requires a table of pairs")
+    mains = np.asarray(mains, dtype=float)
+    extras = np.asarray(extras, dtype=float)
+    mask = ~np.isnan(extras) if mask is None else np.asarray(mask, dtype=bool)
+    w_main, w_extra = pair_tone_weights
+    first, second = table.notes[:, 0], table.notes[:, 1]
+    pair_intervals = np.abs(second - first)
+
+    indices = np.empty(len(mains), dtype=np.intp)
+    tunes = np.empty(len(mains))
+    for start in range(0, len(mains), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        main, valid = mains[chunk], mask[chunk]
+        indices[chunk], tunes[chunk] = table.best_single_matches(main)
+        found = valid.any(axis=1)
+        if not found.any():
+            continue
+
+        # `ChordTable.best_match` for every (chord, extra) target at once, shape (chord, extra, candidate),
+        #   written out for pairs with the default interval weights, in the same order of operations
+        main, valid = main[found, None, None], valid[found]
+        extra = np.where(valid, extras[chunk][found], main[:, :, 0])[:, :, None]
+        interval = (np.abs(extra - main) - pair_intervals) ** 2
+        untuned = (main - first) ** 2 * w_main + (extra - second) ** 2 * w_extra + interval
+        tune = ((first - main) * w_main + (second - extra) * w_extra) / (w_main + w_extra)
+        tuned = ((main + tune) - first) ** 2 * w_main + ((extra + tune) - second) ** 2 * w_extra + interval
+
+        candidates = np.argmin(untuned, axis=2)
+        chosen = np.take_along_axis(tuned, candidates[..., None], axis=2)[..., 0]
+        chosen[~valid] = np.inf
+        rows = np.arange(len(chosen))
+        target = np.argmin(chosen, axis=1)
+        candidate = candidates[rows, target]
+        rows_found = np.flatnonzero(found) + start
+        indices[rows_found] = candidate
+        tunes[rows_found] = tune[rows, target, candidate]
+    return indices, tunes
+
+def as_chord_table(chords: dict[K, Sequence[Tone]] | ChordTable[K]) -> ChordTable[K]:
+    if isinstance(chords, ChordTable):
+        return chords
+    if chords is dtmf_all:
+        return dtmf_all_table
+    return ChordTable(chords)
 
-    tuned = tuple(tone - tune for tone in pairs[k])
-    return k, tuned
-    
 def best_match_for_tuned_chord(chord: list[Tone], chords: dict[K, list[Tone,Tone]], tone_weights: list[float] |  np.ndarray = None, interval_weights: np.ndarray = None) -> K:
     return min(chords, key = lambda k: tuned_loss(chord, chords[k], tone_weights, interval_weights))
 
@@ -57,6 +280,7 @@ def tuned_loss(chord_a: list[Tone], chord_b: list[Tone], tone_weights: list[floa
     tuned_a = [tone + tune for tone in chord_a]
     return loss(tuned_a, chord_b, tone_weights, interval_weights)
 
+@instrument.timed('translator.loss')
 def loss(chord_a: list[Tone], chord_b: list[Tone], tone_weights: list[float] |  np.ndarray = None, interval_weights: np.ndarray = None) -> float:
 
     if tone_weights is None: tone_weights = np.ones_like(chord_a)
@@ -1,3 +1,8 @@
+import importlib.util
+import sys
+import types
+
+
 def lerp(a: float, b: float, t: float) -> float:
     """Linear interpolate on the scale given by a to b, using t as the point on that scale.
     Examples
@@ -27,4 +32,24 @@ def remap(i_min: float, i_max: float, o_min: float, o_max: float, v: float) -> f
         45 == remap(0, 100, 40, 50, 50)
         6.2 == remap(1, 5, 3, 7, 4.2)
     """
-    return lerp(o_min, o_max, inv_lerp(i_min, i_max, v))
\ No newline at end of file
+    return lerp(o_min, o_max, inv_lerp(i_min, i_max, v))
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Import a module when one of its attributes is first used, rather than now.
+    Used for the heavy dependencies (numpy, mido) so that importing this package, or a part of it
+      that doesn't need them, doesn't pay for loading them.
+    Examples
+    --------
+        np = lazy_import("numpy") # nothing is loaded yet
+        np.zeros(3) # loads numpy
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
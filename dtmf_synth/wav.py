@@ -0,0 +1,219 @@
+from __future__ import annotations
+import struct
+from dataclasses import dataclass
+from typing import Generator, Iterable, Sequence
+
+from .util import lazy_import
+
+np = lazy_import("numpy")
+
+__all__ = ["WavFormat", "read_wav_format", "wav_samples", "wav_blocks", "wav_header", "WavWriter"]
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+@dataclass
+class WavFormat:
+    sample_rate: int
+    channels: int
+    dtype: np.dtype
+    data_offset: int
+    """Byte offset of the first sample in the file."""
+    frame_count: int
+
+    @property
+    def scale(self) -> float:
+        """Divisor that maps the stored integer samples to [-1, 1)."""
+        if self.dtype.kind == 'f':
+            return 1.0
+        return float(2 ** (8 * self.dtype.itemsize - 1))
+
+def read_wav_format(path: str) -> WavFormat:
+    """Parse the RIFF chunks of a WAV file, up to the start of its sample data."""
+    with open(path, 'rb') as f:
+        riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError(f"{path} is not a WAV file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                body = f.read(size)
+                format_tag, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', body[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE:
+                    format_tag, = struct.unpack('<H', body[24:26])
+                fmt = format_tag, channels, sample_rate, block_align, bits
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError(f"{path} has no fmt chunk before its data")
+                format_tag, channels, sample_rate, block_align, bits = fmt
+                if format_tag == WAVE_FORMAT_IEEE_FLOAT:
+                    dtype = np.dtype(f'<f{bits // 8}')
+                elif format_tag == WAVE_FORMAT_PCM and bits == 8:
+                    raise ValueError("8-bit WAV files are not supported")
+                elif format_tag == WAVE_FORMAT_PCM:
+                    dtype = np.dtype(f'<i{bits // 8}')
+                else:
+                    raise ValueError(f"unsupported WAV format tag {format_tag:#x}")
+                return WavFormat(sample_rate, channels, dtype, f.tell(), size // block_align)
+            else:
+                f.seek(size + (size & 1), 1) # chunks are padded to an even length
+
+def wav_samples(path: str) -> tuple[WavFormat, np.memmap]:
+    """Memory-map the samples of a WAV file as a (frame, channel) array, without reading them."""
+    fmt = read_wav_format(path)
+    samples = np.memmap(path, dtype=fmt.dtype, mode='r', offset=fmt.data_offset, shape=(fmt.frame_count, fmt.channels))
+    return fmt, samples
+
+def wav_blocks(path: str, block_size: int = 1 << 16, channel: int | None = None) -> tuple[int, Generator[np.ndarray, None, None]]:
+    """Read a WAV file as float blocks of up to `block_size` frames, only touching one block of the mapping at a time.
+    Returns the sample rate and the block generator.
+    Blocks contain a single `channel`, or the mean of all channels if `channel` is None.
+    """
+    fmt, samples = wav_samples(path)
+
+    def blocks():
+        for start in range(0, fmt.frame_count, block_size):
+            block = samples[start:start + block_size]
+            block = block.mean(axis=1) if channel is None else block[:, channel].astype(np.float64)
+            yield block / fmt.scale
+
+    return fmt.sample_rate, blocks()
+
+def wav_header(sample_rate: int, channels: int, dtype: np.dtype, frame_count: int) -> bytes:
+    """The RIFF, fmt and data chunk headers for `frame_count` frames of samples, which follow directly after it."""
+    dtype = np.dtype(dtype)
+    block_align = channels * dtype.itemsize
+    data_size = frame_count * block_align
+    if dtype.kind == 'f':
+        fmt = struct.pack('<4sIHHIIHHH', b'fmt ', 18, WAVE_FORMAT_IEEE_FLOAT, channels, sample_rate, sample_rate * block_align, block_align, 8 * dtype.itemsize, 0)
+        fmt += struct.pack('<4sII', b'fact', 4, frame_count) # required for non-PCM formats
+    else:
+        fmt = struct.pack('<4sIHHIIHH', b'fmt ', 16, WAVE_FORMAT_PCM, channels, sample_rate, sample_rate * block_align, block_align, 8 * dtype.itemsize)
+    riff_size = 4 + len(fmt) + 8 + data_size + (data_size & 1)
+    if riff_size > 0xFFFFFFFF:
+        raise ValueError("too much sample data for a WAV file; write raw PCM instead")
+    return struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE') + fmt + struct.pack('<4sI', b'data', data_size)
+
+class WavWriter:
+    """Writes float sample blocks in [-1, 1] to a memory-mapped WAV file, or raw PCM if `raw`,
+      block by block rather than building the output in memory. Float samples are copied straight into the mapping;
+      integer samples are scaled and clipped in a reused scratch block first.
+    The file is preallocated for `frames` frames and doubles in size whenever a write runs past the end;
+      `close` trims it to the frames written and fills in the header.
+    Frames that were never written, such as the tail of a channel that ended early, are silent.
+    """
+
+    def __init__(self, path: str, sample_rate: int, channels: int = 1, dtype: np.dtype | str = '<i2', frames: int = 0, raw: bool = False):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        if self.dtype.kind not in 'if' or self.dtype.itemsize < 2:
+            raise ValueError(f"unsupported sample type {self.dtype}")
+        self.raw = raw
+        self.scale = 1.0 if self.dtype.kind == 'f' else float(2 ** (8 * self.dtype.itemsize - 1))
+        """Multiplier from [-1, 1) to the stored samples, the inverse of `WavFormat.scale`."""
+        self.data_offset = 0 if raw else len(wav_header(sample_rate, channels, self.dtype, 0))
+        self.max_frames = None if raw else (0xFFFFFFFF - (self.data_offset - 8) - 1) // (channels * self.dtype.itemsize)
+        """The most frames the RIFF sizes can describe, or None for raw PCM."""
+        self.frames = 0
+        """Number of frames written, up to the last frame of any channel."""
+        self.capacity = 0
+        self.samples: np.memmap | None = None
+        """The mapped (frame, channel) sample array, covering the allocated capacity."""
+        self.scratch: np.ndarray | None = None
+        self.file = open(path, 'w+b')
+        self.file.write(bytes(self.data_offset))
+        if frames:
+            self.reserve(frames)
+
+    def reserve(self, frames: int):
+        """Make room for at least `frames` frames in total."""
+        if frames <= self.capacity:
+            return
+        if self.max_frames is not None and frames > self.max_frames:
+            raise ValueError("too much sample data for a WAV file; write raw PCM instead")
+        capacity = max(frames, 2 * self.capacity, self.sample_rate)
+        if self.max_frames is not None:
+            capacity = min(capacity, self.max_frames)
+        if self.samples is not None:
+            self.samples.flush()
+            self.samples = None
+        self.file.truncate(self.data_offset + capacity * self.channels * self.dtype.itemsize) # extends with zeros
+        self.samples = np.memmap(self.file, dtype=self.dtype, mode='r+', offset=self.data_offset, shape=(capacity, self.channels))
+        self.capacity = capacity
+
+    def write_at(self, start: int, block: np.ndarray, channel: int | None = None):
+        """Write a block starting at frame `start`, either to one `channel` or, if None,
+          to every channel, as a (frame, channel) array or a mono block repeated across them.
+        """
+        block = np.asarray(block)
+        end = start + len(block)
+        self.reserve(end)
+        out = self.samples[start:end] if channel is None else self.samples[start:end, channel]
+        if block.ndim == 1 and out.ndim == 2:
+            block = block[:, None]
+        if self.dtype.kind == 'f':
+            np.copyto(out, block, casting='unsafe')
+        else:
+            if self.scratch is None or self.scratch.shape != block.shape:
+                self.scratch = np.empty(block.shape)
+            scale = self.scale
+            np.multiply(block, scale, out=self.scratch)
+            np.clip(self.scratch, -scale, scale - 1, out=self.scratch)
+            np.copyto(out, self.scratch, casting='unsafe')
+        self.frames = max(self.frames, end)
+
+    def write(self, block: np.ndarray):
+        """Append a block to every channel."""
+        self.write_at(self.frames, block)
+
+    def write_blocks(self, blocks: Iterable[np.ndarray]) -> int:
+        """Append every block, such as from `ToneRenderer.render`, returning the number of frames written."""
+        for block in blocks:
+            self.write(block)
+        return self.frames
+
+    def write_channels(self, channel_blocks: Sequence[Iterable[np.ndarray]]) -> int:
+        """Write one block stream per channel, in step, each from the start of the file.
+        Streams may end at different times; the shorter ones are padded with silence.
+        Returns the number of frames written.
+        """
+        if len(channel_blocks) != self.channels:
+            raise ValueError(f"expected {self.channels} block streams, got {len(channel_blocks)}")
+        streams = [iter(blocks) for blocks in channel_blocks]
+        positions = [0] * self.channels
+        active = list(range(self.channels))
+        while active:
+            for channel in list(active):
+                block = next(streams[channel], None)
+                if block is None:
+                    active.remove(channel)
+                    continue
+                self.write_at(positions[channel], block, channel)
+                positions[channel] += len(block)
+        return self.frames
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self.samples is not None:
+            self.samples.flush()
+            self.samples = None
+        data_size = self.frames * self.channels * self.dtype.itemsize
+        self.file.truncate(self.data_offset + data_size + (0 if self.raw else data_size & 1))
+        if not self.raw:
+            self.file.seek(0)
+            self.file.write(wav_header(self.sample_rate, self.channels, self.dtype, self.frames))
+        self.file.close()
+
+    def __enter__(self) -> WavWriter:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
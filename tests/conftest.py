@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "timing: asserts on wall-clock time; only runs with DTMF_SYNTH_TIMING_TESTS=1")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("DTMF_SYNTH_TIMING_TESTS"):
+        return
+    skip = pytest.mark.skip(reason="set DTMF_SYNTH_TIMING_TESTS=1 to run wall-clock timing tests")
+    for item in items:
+        if "timing" in item.keywords:
+            item.add_marker(skip)
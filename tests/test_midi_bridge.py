@@ -0,0 +1,69 @@
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+
+import mido
+import pytest
+
+from dtmf_synth.midi_bridge import MidiBridge, LoopbackPort
+from dtmf_synth.pair_cache import BestPairCache
+from dtmf_synth.tone_reader import ToneReader
+from dtmf_synth.translator import ChordTable, dtmf_all
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def bridge_chord(bridge: MidiBridge, notes: list[int]):
+    async def messages():
+        for note in notes:
+            yield bridge.clock(), mido.Message('note_on', note=note, velocity=100)
+    asyncio.run(bridge.run(messages()))
+
+def test_bridge_plays_chords():
+    output = LoopbackPort()
+    bridge = MidiBridge(output)
+    bridge_chord(bridge, [60, 64, 67])
+    assert len(bridge.latencies) == 3
+    sent = list(output.iter_pending())
+    assert [msg.type for msg in sent].count('note_on') == 6
+
+def test_missed_deadline_plays_nearest_single_pair():
+    output = LoopbackPort()
+    bridge = MidiBridge(output, latency_budget=0)
+    bridge_chord(bridge, [60, 64, 67])
+    assert bridge.counts['single'] == 2
+    assert len(bridge.latencies) == 3
+    sent = list(output.iter_pending())
+    assert [msg.type for msg in sent].count('note_on') == 6
+
+def test_warm_up_builds_tables():
+    cache, coarse_cache = BestPairCache(pairs=ChordTable(dtmf_all)), BestPairCache(pairs=ChordTable(dtmf_all), resolution=50)
+    MidiBridge(LoopbackPort(), cache=cache, coarse_cache=coarse_cache)
+    for table in (cache.table, coarse_cache.table):
+        for name in ('notes', 'default_weighted_intervals', 'first_candidates'):
+            assert name in vars(table)
+
+def test_searches_within_deadline_are_exact():
+    # a clock that never advances: every search is instant, so each chord is searched inline and then cached
+    bridge = MidiBridge(LoopbackPort(), clock=lambda: 0.0)
+    bridge_chord(bridge, [60, 64, 67])
+    assert bridge.counts == {'cached': 0, 'exact': 2, 'coarse': 0, 'single': 0}
+    assert list(bridge.latencies) == [0.0] * 3
+    bridge.reader = ToneReader()
+    bridge_chord(bridge, [60, 64, 67])
+    assert bridge.counts == {'cached': 2, 'exact': 2, 'coarse': 0, 'single': 0}
+
+@pytest.mark.timing
+def test_first_chord_meets_deadline_in_fresh_process():
+    # nothing may be loaded yet when the first chord arrives, so run it in a new interpreter
+    script = textwrap.dedent("""
+        from tests.test_midi_bridge import bridge_chord
+        from dtmf_synth.midi_bridge import MidiBridge, LoopbackPort
+        bridge = MidiBridge(LoopbackPort())
+        bridge_chord(bridge, [60, 64, 67])
+        print(max(bridge.latencies), bridge.latency_budget)
+    """)
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    latency, budget = map(float, result.stdout.split())
+    assert latency < budget
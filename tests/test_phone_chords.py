@@ -0,0 +1,16 @@
+from dtmf_synth.phone_chords import ToneTable, dtmf, dtmf_hl, dtmf_lh
+from dtmf_synth.tone import Tone
+
+
+def test_union_with_tables_and_dicts():
+    assert isinstance(dtmf_lh | dtmf_hl, ToneTable)
+    assert dict(dtmf_lh | dtmf_hl) == {**dtmf_lh, **dtmf_hl}
+
+    extra = {'tone_440': (Tone(freq=440),), 'key_1_lh': (Tone(freq=697),)}
+    assert dtmf | extra == {**dtmf, **extra}
+    assert extra | dtmf == {**extra, **dtmf}
+    assert (extra | dtmf)['key_1_lh'] == dtmf['key_1_lh']
+
+    overlapping = dtmf_lh | ToneTable(('key_1_lh',), ((1000.0, 2000.0),))
+    assert len(overlapping) == len(dtmf_lh)
+    assert [tone.freq for tone in overlapping['key_1_lh']] == [1000.0, 2000.0]
@@ -0,0 +1,20 @@
+import mido
+
+from dtmf_synth.pipeline import convert_file
+
+
+def test_convert_file_counts_every_chord(tmp_path):
+    track = mido.MidiTrack([
+        mido.Message('note_on', note=60, velocity=64, time=0),
+        mido.Message('note_on', note=64, velocity=64, time=100),
+        mido.Message('note_off', note=64, time=100),
+        mido.Message('note_off', note=60, time=100),
+        mido.Message('note_on', note=67, velocity=64, time=100),
+        mido.Message('note_off', note=67, time=100),
+    ])
+    input_path = tmp_path / 'input.mid'
+    mido.MidiFile(tracks=[track]).save(input_path)
+
+    summary = convert_file(str(input_path), midi_path=str(tmp_path / 'output.mid'))
+    assert summary['chords'] == 4 # 60, 60+64, 60 and 67
+    assert summary['distinct_chords'] == 1
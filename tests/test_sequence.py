@@ -0,0 +1,40 @@
+import pytest
+
+from dtmf_synth.benchmark import Workload
+from dtmf_synth.midi_optimizer import MidiOutputOptimizer
+from dtmf_synth.pipeline import main_and_extras, pairs_to_messages, timed_tone_sets
+from dtmf_synth.sequence import StreamingSequenceTranslator, translate_sequence
+from dtmf_synth.tone_reader import ToneReader
+from dtmf_synth.translator import best_pair, dtmf_all
+
+
+def churn(times, results):
+    """The number of key changes and of pitchwheel messages needed to play `results`."""
+    keys = [k for k, _ in results]
+    messages = MidiOutputOptimizer().filter_timed(pairs_to_messages(zip(times, [pair for _, pair in results])))
+    return sum(a != b for a, b in zip(keys, keys[1:])), sum(msg.type == 'pitchwheel' for _, msg in messages)
+
+
+def test_defaults_reduce_churn():
+    for workload in (Workload(length=20, polyphony=2, pitchbends_per_second=0), Workload(length=20, seed=1)):
+        timed_tones = [(time, tones) for time, tones in timed_tone_sets(workload.messages(), ToneReader()) if tones]
+        times = [time for time, _ in timed_tones]
+        chords = [main_and_extras(tones) for _, tones in timed_tones]
+
+        independent_keys, independent_bends = churn(times, [best_pair(main, extras) for main, extras in chords])
+        keys, bends = churn(times, translate_sequence(chords))
+        assert keys < independent_keys
+        assert bends < independent_bends
+
+        translator = StreamingSequenceTranslator()
+        streamed = [result for main, extras in chords for result in translator.push(main, extras)] + translator.flush()
+        keys, bends = churn(times, streamed)
+        assert keys < independent_keys
+        assert bends < independent_bends
+
+
+def test_pairs_are_tuned_table_chords():
+    chords = [main_and_extras(tones) for _, tones in timed_tone_sets(Workload(length=5).messages(), ToneReader()) if tones]
+    for k, pair in translate_sequence(chords):
+        tune = dtmf_all[k][0].note - pair[0].note
+        assert [tone.note for tone in pair] == pytest.approx([(tone - tune).note for tone in dtmf_all[k]])
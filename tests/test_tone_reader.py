@@ -0,0 +1,54 @@
+import mido
+
+from dtmf_synth.tone_reader import ADDED, REMOVED, TOUCHED, MultiToneReader, ToneReader
+
+
+def test_changes_keep_their_meta():
+    messages = [
+        mido.Message('note_on', note=60, velocity=53),
+        mido.Message('polytouch', note=60, value=90),
+        mido.Message('note_off', note=60, velocity=20),
+    ]
+    for reader in (ToneReader(), MultiToneReader()):
+        changes = list(reader.messages_to_changes(messages))
+        assert [change.kind for change in changes] == [ADDED, TOUCHED, REMOVED]
+        assert changes[0].meta == {'velocity': 53}
+        assert changes[0].tone.meta == {'velocity': 53}
+        assert changes[1].meta['polytouch'] == 90
+
+
+def test_readers_agree():
+    messages = [
+        mido.Message('note_on', note=64, velocity=53),
+        mido.Message('note_on', note=60, velocity=70),
+        mido.Message('note_on', note=62, velocity=70, channel=1),
+        mido.Message('note_on', note=64, velocity=90), # retriggered
+        mido.Message('polytouch', note=60, value=30),
+        mido.Message('pitchwheel', pitch=4096),
+        mido.Message('note_off', note=64, velocity=10),
+        mido.Message('note_on', note=67, velocity=80),
+        mido.Message('reset'),
+    ]
+    single = ToneReader()
+    single_changes = list(single.messages_to_changes(messages))
+    multi = MultiToneReader()
+    multi_changes = [change._replace(channel=None) for change in multi.messages_to_changes(messages) if change.channel == 0]
+    assert multi_changes == single_changes
+    assert [change.kind for change in single_changes[:5]] == [ADDED, ADDED, REMOVED, ADDED, TOUCHED]
+
+
+def test_retriggered_note():
+    messages = [
+        mido.Message('note_on', note=60, velocity=53),
+        mido.Message('note_on', note=60, velocity=90),
+        mido.Message('note_off', note=60),
+    ]
+    single, multi = ToneReader(), MultiToneReader()
+    for reader, current_tones in ((single, single.current_tones), (multi, lambda: multi.current_tones(0))):
+        changes = list(reader.messages_to_changes(messages[:2]))
+        assert [change.kind for change in changes] == [ADDED, REMOVED, ADDED]
+        assert changes[1].meta == {'velocity': 53}
+        assert changes[2].meta == {'velocity': 90}
+        assert [tone.note for tone in current_tones()] == [60]
+        assert [change.kind for change in reader.messages_to_changes(messages[2:])] == [REMOVED]
+        assert current_tones() == []
@@ -0,0 +1,39 @@
+import numpy as np
+
+from dtmf_synth.tone import Tone
+from dtmf_synth.tone_renderer import ToneRenderer
+
+
+def test_ramp_reaches_target_in_ramp_time():
+    renderer = ToneRenderer(sample_rate=1000, ramp_time=0.01)
+    renderer.set_tones([Tone(freq=100, meta={'velocity': 127})])
+    renderer.synthesize(10)
+    assert np.isclose(renderer.gains[0], renderer.amplitude)
+
+    renderer.set_tones([Tone(freq=100, meta={'velocity': 64})])
+    renderer.synthesize(5)
+    assert renderer.gains[0] > renderer.amplitude * 64 / 127
+    renderer.synthesize(5)
+    assert np.isclose(renderer.gains[0], renderer.amplitude * 64 / 127)
+
+
+def test_voices_follow_their_tones():
+    renderer = ToneRenderer(sample_rate=1000, ramp_time=0.01)
+    renderer.set_tones([Tone(freq=100), Tone(freq=200), Tone(freq=300)])
+    renderer.synthesize(20)
+    renderer.set_tones([Tone(freq=100), Tone(freq=300)])
+    assert list(renderer.freqs) == [100, 200, 300]
+    assert list(renderer.held) == [True, False, True]
+
+    # a new tone waits for a silent voice rather than taking over the fading one
+    renderer.set_tones([Tone(freq=100), Tone(freq=300), Tone(freq=400)])
+    assert list(renderer.freqs) == [100, 200, 300, 400]
+
+
+def test_bent_tone_set_keeps_its_voices():
+    renderer = ToneRenderer(sample_rate=1000, ramp_time=0.01)
+    renderer.set_tones([Tone(freq=100), Tone(freq=200)])
+    renderer.synthesize(20)
+    renderer.set_tones([Tone(freq=101), Tone(freq=202)])
+    assert list(renderer.freqs) == [101, 202]
+    assert np.all(renderer.gains > 0)
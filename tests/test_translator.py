@@ -0,0 +1,57 @@
+import random
+import timeit
+
+import pytest
+
+from dtmf_synth.tone import Tone
+from dtmf_synth.translator import best_bulk_tune, best_match_for_chord, best_pair, dtmf_all, dtmf_all_table, tuned_loss
+
+
+def reference_best_pair(main, extras, pairs=dtmf_all):
+    """`best_pair` as written before `ChordTable`, one `loss` call per (target, candidate)."""
+    tone_weights = [1, 0.5]
+    targets = [(main, extra) for extra in extras]
+    matches = [(target, best_match_for_chord(target, pairs, tone_weights)) for target in targets]
+    target, k = min(matches, key=lambda match: tuned_loss(match[0], pairs[match[1]], tone_weights))
+    tune = best_bulk_tune(target, pairs[k], tone_weights)
+    return k, tuple(tone - tune for tone in pairs[k])
+
+
+def test_best_pair_matches_reference():
+    rng = random.Random(0)
+    for _ in range(100):
+        main = Tone(note=rng.uniform(60, 100))
+        extras = [Tone(note=rng.uniform(50, 100)) for _ in range(rng.randint(1, 4))]
+        k, tuned = best_pair(main, extras)
+        expected_k, expected_tuned = reference_best_pair(main, extras)
+        assert k == expected_k
+        assert [tone.note for tone in tuned] == pytest.approx([tone.note for tone in expected_tuned])
+
+
+@pytest.mark.timing
+@pytest.mark.parametrize('extra_count', [1, 2])
+def test_best_pair_speedup(extra_count):
+    dtmf_all_table.prepare()
+    main = Tone(note=81.3)
+    extras = [Tone(note=76.1 + 3 * i) for i in range(extra_count)]
+    reference = min(timeit.repeat(lambda: reference_best_pair(main, extras), number=3, repeat=3)) / 3
+    vectorized = min(timeit.repeat(lambda: best_pair(main, extras), number=200, repeat=5)) / 200
+    assert reference / vectorized >= 50
+
+
+def test_cached_searches_are_timed():
+    from dtmf_synth import instrument
+    from dtmf_synth.pair_cache import BestPairCache
+
+    instrument.reset()
+    instrument.enable()
+    try:
+        cache = BestPairCache()
+        cache.best_pair(Tone(note=70), [Tone(note=65)])
+        cache.best_pair(Tone(note=70), [Tone(note=65)])
+        counters = instrument.snapshot()
+    finally:
+        instrument.disable()
+        instrument.reset()
+    assert counters['translator.best_match.calls'] == 1
+    assert counters['cache.hits'] == 1
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from dtmf_synth.wav import WavWriter, wav_samples
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'out.wav')
+    with WavWriter(path, 8000, channels=2) as writer:
+        writer.write(np.array([0.0, 0.5, -1.0, 2.0]))
+        writer.write_at(1, np.array([0.25, 0.25]), channel=1)
+    fmt, samples = wav_samples(path)
+    assert fmt.frame_count == 4
+    assert samples[:, 0].tolist() == [0, 16384, -32768, 32767]
+    assert samples[:, 1].tolist() == [0, 8192, 8192, 32767]
+
+
+def test_refuses_to_grow_past_the_riff_limit(tmp_path):
+    path = str(tmp_path / 'out.wav')
+    writer = WavWriter(path, 8000)
+    with pytest.raises(ValueError):
+        writer.reserve(writer.max_frames + 1)
+    assert writer.capacity == 0
+    writer.close()